@@ -1,59 +1,122 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_async_db
+from app.core.config import settings
+from app.core.database import get_lazy_async_db
+from app.core.idempotency import IdempotencyError, IdempotentRequest, get_idempotency_key, request_fingerprint
+from app.core.http_cache import response_seed, make_etag, is_not_modified, post_precondition_status, cache_headers
 from app.schemas.devotion import DevotionRequest, DevotionResponse
 from app.services.ai import ResponseGenerator
-from app.models.entry import Entry, EntryType
+from app.services.ai.cache import normalize_feeling
+from app.services.ai.response_generator import DEVOTION_THEMES
+from app.services.catalog import get_devotion_catalog
+from app.models.entry import EntryType
+from app.services.history import persist_entries
+from typing import Optional
 import json
 
 router = APIRouter()
 
+# The theme list only changes with a deploy, so it is encoded once and cached at the edge
+THEMES_BODY = json.dumps({"themes": DEVOTION_THEMES}, separators=(",", ":")).encode("utf-8")
+THEMES_ETAG = make_etag(settings.CONTENT_VERSION, THEMES_BODY.decode("utf-8"))
+THEMES_HEADERS = {
+    "ETag": THEMES_ETAG,
+    "Cache-Control": "public, max-age=86400, stale-while-revalidate=604800",
+}
+
 @router.post("/", response_model=DevotionResponse)
 async def generate_devotion(
     request: DevotionRequest,
-    db: AsyncSession = Depends(get_async_db)
+    http_request: Request,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: AsyncSession = Depends(get_lazy_async_db)
 ):
     """
     Generate a 10-minute devotion plan with scripture, reflection, and YouTube video
     """
+    idempotency = None
     try:
+        # In deterministic mode the plan is fixed by (theme or text, user, day), so the ETag is known up front.
+        # It is weak: the video comes from a cached search or the fallback list, and a
+        # cataloged theme serves the catalog's plan, so equivalent days can differ in bytes
+        seed = None
+        headers = {}
+        if settings.DETERMINISTIC_RESPONSES:
+            seed_key = request.theme or (normalize_feeling(request.text) if request.text else "")
+            seed = response_seed(seed_key, request.user_id)
+            headers = cache_headers(
+                make_etag(settings.CONTENT_VERSION, "devotion", seed, weak=True),
+                private=request.user_id is not None
+            )
+            # Guests write nothing, so a current copy can skip the request; logged-in requests always save their entry
+            if request.user_id is None:
+                status = post_precondition_status(http_request, headers["ETag"])
+                if status is not None:
+                    return Response(status_code=status, headers=headers if status == 304 else None)
+        
+        # Replay a retried request, or wait for the first copy of it to finish
+        if idempotency_key:
+            idempotency = IdempotentRequest(
+                f"devotion:{request.user_id or 'guest'}",
+                idempotency_key,
+                request_fingerprint(request.theme or "", request.text or "", str(request.user_id))
+            )
+            stored = await idempotency.begin()
+            if stored is not None:
+                return Response(content=stored, media_type="application/json", headers={**headers, "Idempotent-Replayed": "true"})
+        
         response_generator = ResponseGenerator()
+        catalog = get_devotion_catalog()
+        theme = response_generator.resolve_theme(request.theme, request.text, seed)
         
-        # Generate devotion
-        devotion = await response_generator.generate_devotion(
-            theme=request.theme,
-            feeling_text=request.text,
-            user_id=request.user_id
-        )
+        # Serve today's precomputed plan with one lookup, generating live only on a miss
+        devotion = None
+        body = await catalog.get(theme) if settings.DEVOTION_CATALOG_ENABLED else None
+        if body is None:
+            if settings.DEVOTION_CATALOG_ENABLED and catalog.is_cataloged(theme):
+                # Use the catalog's seed so the plan can be written through for later requests
+                seed = catalog.seed(theme)
+            
+            devotion = await response_generator.generate_devotion(
+                theme=theme,
+                user_id=request.user_id,
+                seed=seed
+            )
+            body = catalog.serialize(devotion)
+            if settings.DEVOTION_CATALOG_ENABLED:
+                await catalog.put(theme, body)
         
         # Save entry to database if user is logged in
         if request.user_id:
-            entry = Entry(
-                user_id=request.user_id,
-                type=EntryType.DEVOTION,
-                topic=devotion["theme"],
-                input_text=request.text if request.text else None,
-                response_json=devotion
-            )
-            db.add(entry)
-            await db.commit()
+            if devotion is None:
+                devotion = json.loads(body)
+            await persist_entries(db, [{
+                "user_id": request.user_id,
+                "type": EntryType.DEVOTION,
+                "topic": devotion["theme"],
+                "input_text": request.text if request.text else None,
+                "response_json": devotion
+            }])
+        
+        if idempotency:
+            await idempotency.complete(body)
         
-        return DevotionResponse(
-            plan=devotion["plan"],
-            video=devotion["video"],
-            theme=devotion["theme"]
-        )
+        return Response(content=body, media_type="application/json", headers=headers)
         
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating devotion: {str(e)}")
+    finally:
+        # Frees the key if generation failed or was cancelled; a no-op once the response is stored
+        if idempotency:
+            await idempotency.release()
 
 @router.get("/themes")
-async def get_available_themes():
+async def get_available_themes(request: Request):
     """
     Get list of available devotion themes
     """
-    themes = [
-        "peace", "hope", "comfort", "strength", "love", 
-        "gratitude", "anxiety", "loneliness", "forgiveness"
-    ]
-    return {"themes": themes}
+    if is_not_modified(request, THEMES_ETAG):
+        return Response(status_code=304, headers=THEMES_HEADERS)
+    return Response(content=THEMES_BODY, media_type="application/json", headers=THEMES_HEADERS)
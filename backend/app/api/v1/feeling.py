@@ -1,23 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_async_db
-from app.schemas.feeling import FeelingRequest, FeelingResponse
-from app.services.ai import ResponseGenerator
+from app.core.config import settings
+from app.core.database import get_lazy_async_db, AsyncSessionLocal
+from app.core.idempotency import IdempotencyError, IdempotentRequest, get_idempotency_key, request_fingerprint
+from app.core.http_cache import response_seed, make_etag, post_precondition_status, cache_headers
+from app.schemas.feeling import FeelingRequest, FeelingResponse, FeelingBatchRequest, FeelingBatchResponse
+from app.services.ai import ResponseGenerator, get_reflection_service
+from app.services.ai.cache import normalize_feeling
+from app.services.ai.fragments import get_response_fragments
 from app.core.crisis_detection import CrisisDetector
-from app.models.entry import Entry, EntryType
+from app.models.entry import EntryType
+from app.services.history import persist_entries
 from typing import Optional
 import json
+import logging
+
+logger = logging.getLogger("abide")
 
 router = APIRouter()
 
 @router.post("/", response_model=FeelingResponse)
 async def process_feeling(
     request: FeelingRequest,
-    db: AsyncSession = Depends(get_async_db)
+    http_request: Request,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: AsyncSession = Depends(get_lazy_async_db)
 ):
     """
     Process a user's feeling and return relevant Bible verses, reflection, and prayer
     """
+    idempotency = None
     try:
         # Check for crisis indicators first
         crisis_detector = CrisisDetector()
@@ -25,7 +38,7 @@ async def process_feeling(
             crisis_response = crisis_detector.get_crisis_response(request.text)
             
             # Convert crisis response to FeelingResponse format
-            return FeelingResponse(
+            body = get_response_fragments().feeling_response(
                 verses=crisis_response["supportive_verses"],
                 reflection="",  # No reflection for crisis situations
                 prayer=crisis_response["prayer"],
@@ -35,32 +48,186 @@ async def process_feeling(
                 supportive_verses=crisis_response["supportive_verses"],
                 resources=crisis_response["resources"]
             )
+            return Response(content=body, media_type="application/json")
+        
+        # In deterministic mode the response is fixed by (input, user, day), so the ETag is known up front
+        seed = None
+        headers = {}
+        if settings.DETERMINISTIC_RESPONSES:
+            seed = response_seed(normalize_feeling(request.text), request.user_id)
+            # Generated reflections are only equivalent, not byte-identical, across cache misses
+            weak = get_reflection_service().backend_name != "template"
+            etag = make_etag(settings.CONTENT_VERSION, "feel", seed, weak=weak)
+            headers = cache_headers(etag, private=request.user_id is not None)
+            # Guests write nothing, so a current copy can skip the request; logged-in requests always save their entry
+            if request.user_id is None:
+                status = post_precondition_status(http_request, etag)
+                if status is not None:
+                    return Response(status_code=status, headers=headers if status == 304 else None)
+        
+        # Replay a retried request, or wait for the first copy of it to finish
+        if idempotency_key:
+            idempotency = IdempotentRequest(
+                f"feel:{request.user_id or 'guest'}",
+                idempotency_key,
+                request_fingerprint(request.text, str(request.user_id))
+            )
+            stored = await idempotency.begin()
+            if stored is not None:
+                return Response(content=stored, media_type="application/json", headers={**headers, "Idempotent-Replayed": "true"})
         
         # Generate normal response
         response_generator = ResponseGenerator()
         response = await response_generator.generate_feeling_response(
             request.text, 
-            request.user_id
+            request.user_id,
+            seed=seed
         )
         
         # Save entry to database if user is logged in
         if request.user_id:
-            entry = Entry(
-                user_id=request.user_id,
-                type=EntryType.FEEL,
-                topic=response["topic"],
-                input_text=request.text if request.user_id else None,  # Only save text for logged-in users
-                response_json=response
-            )
-            db.add(entry)
-            await db.commit()
+            await persist_entries(db, [{
+                "user_id": request.user_id,
+                "type": EntryType.FEEL,
+                "topic": response["topic"],
+                "input_text": request.text if request.user_id else None,  # Only save text for logged-in users
+                "response_json": response
+            }])
         
-        return FeelingResponse(
+        # Assemble the body from pre-encoded fragments; response_model is kept for the schema docs
+        body = get_response_fragments().feeling_response(
             verses=response["verses"],
             reflection=response["reflection"],
             prayer=response["prayer"],
             topic=response["topic"]
         )
+        if idempotency:
+            await idempotency.complete(body)
+        
+        return Response(content=body, media_type="application/json", headers=headers)
         
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing feeling: {str(e)}")
+    finally:
+        # Frees the key if generation failed or was cancelled; a no-op once the response is stored
+        if idempotency:
+            await idempotency.release()
+
+@router.post("/batch", response_model=FeelingBatchResponse)
+async def process_feelings_batch(
+    request: FeelingBatchRequest,
+    db: AsyncSession = Depends(get_lazy_async_db)
+):
+    """
+    Process many feelings at once, returning results in input order
+    """
+    if len(request.items) > settings.MAX_FEELING_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds limit of {settings.MAX_FEELING_BATCH_SIZE}"
+        )
+    
+    try:
+        texts = [item.text for item in request.items]
+        fragments = get_response_fragments()
+        results = [None] * len(texts)
+        
+        # Screen the whole batch for crisis indicators in one pass
+        crisis_detector = CrisisDetector()
+        flagged = crisis_detector.detect_crisis_batch(texts)
+        for index, is_crisis in enumerate(flagged):
+            if is_crisis:
+                crisis_response = crisis_detector.get_crisis_response(texts[index])
+                results[index] = fragments.feeling_response(
+                    verses=crisis_response["supportive_verses"],
+                    reflection="",  # No reflection for crisis situations
+                    prayer=crisis_response["prayer"],
+                    topic=crisis_response["topic"],
+                    crisis_detected=True,
+                    message=crisis_response["message"],
+                    supportive_verses=crisis_response["supportive_verses"],
+                    resources=crisis_response["resources"]
+                )
+        
+        # Generate the remaining responses together
+        pending = [index for index, is_crisis in enumerate(flagged) if not is_crisis]
+        seeds = None
+        if settings.DETERMINISTIC_RESPONSES:
+            seeds = [
+                response_seed(normalize_feeling(texts[index]), request.items[index].user_id)
+                for index in pending
+            ]
+        
+        response_generator = ResponseGenerator()
+        responses = await response_generator.generate_feeling_responses(
+            [texts[index] for index in pending],
+            seeds=seeds
+        )
+        
+        entries = []
+        for index, response in zip(pending, responses):
+            results[index] = fragments.feeling_response(
+                verses=response["verses"],
+                reflection=response["reflection"],
+                prayer=response["prayer"],
+                topic=response["topic"]
+            )
+            
+            # Save entries for logged-in users
+            user_id = request.items[index].user_id
+            if user_id:
+                entries.append({
+                    "user_id": user_id,
+                    "type": EntryType.FEEL,
+                    "topic": response["topic"],
+                    "input_text": texts[index],
+                    "response_json": response
+                })
+        
+        await persist_entries(db, entries)
+        
+        return Response(content=fragments.feeling_batch_response(results), media_type="application/json")
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing feelings: {str(e)}")
+
+@router.post("/stream")
+async def stream_feeling(request: FeelingRequest):
+    """
+    Process a user's feeling and stream the response as newline-delimited JSON events
+    
+    If a logged-in user's entry can't be saved, an `error` event comes just
+    before `done`, so clients can tell a failed save from a dropped stream.
+    """
+    crisis_detector = CrisisDetector()
+    if crisis_detector.detect_crisis(request.text):
+        crisis_response = crisis_detector.get_crisis_response(request.text)
+        event = {"event": "crisis", **crisis_response}
+        return StreamingResponse(iter([json.dumps(event) + "\n"]), media_type="application/x-ndjson")
+    
+    response_generator = ResponseGenerator()
+    
+    async def event_stream():
+        async for event in response_generator.stream_feeling_response(request.text, request.user_id):
+            if event["event"] == "done" and request.user_id:
+                # Save entry once the full reflection is known
+                response = {key: value for key, value in event.items() if key != "event"}
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await persist_entries(db, [{
+                            "user_id": request.user_id,
+                            "type": EntryType.FEEL,
+                            "topic": response["topic"],
+                            "input_text": request.text,
+                            "response_json": response
+                        }])
+                except Exception as e:
+                    # The response is already streaming, so report the failed save in-band
+                    logger.error("Failed to save streamed feeling for user %s: %r", request.user_id, e)
+                    yield json.dumps({"event": "error", "detail": "Your entry couldn't be saved to history"}) + "\n"
+            
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.core.database import get_async_db
+from sqlalchemy import select, tuple_
+from app.core.database import get_async_db, get_async_read_db, read_sessionmaker
+from app.core.config import settings
+from app.core.idempotency import IdempotencyError, IdempotentRequest, get_idempotency_key, request_fingerprint
+from app.core.pagination import encode_cursor, decode_cursor, encode_change_cursor, decode_change_cursor
+from app.services.content import get_content_store
+from app.services.history import search_entries, MAX_SEARCH_RESULTS, get_changes, get_head, get_trend, MAX_TREND_DAYS, get_counts, create_bookmark, find_bookmark, delete_bookmark, create_bookmarks, delete_bookmarks
+from app.services.history.counters import BOOKMARK
+from app.services.history.fields import ENTRY_LIST_FIELDS, BOOKMARK_ENTRY_FIELDS, parse_fields, entry_columns, serialize_entry
+from app.services.history.export import EXPORT_FORMATS, export_records, export_ndjson, export_csv
 from app.models.entry import Entry, EntryType
 from app.models.bookmark import Bookmark
 from app.models.user import User
-from typing import List, Optional
-from datetime import datetime
+from app.schemas.bookmark import BookmarkBatchRequest, BookmarkBatchResponse
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import json
 
 router = APIRouter()
 
@@ -16,75 +27,244 @@ async def get_user_entries(
     entry_type: Optional[EntryType] = None,
     limit: int = 20,
     offset: int = 0,
-    db: AsyncSession = Depends(get_async_db)
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get user's entries (feelings and devotions)
+    
+    Pass the previous page's next_cursor as `after` to page through history;
+    every page then costs the same index range scan regardless of depth.
+    Pass `fields` (e.g. `id,type,topic,created_at`) to select only those
+    columns; list views can skip loading responses entirely.
     """
     try:
-        query = select(Entry).where(Entry.user_id == user_id)
+        try:
+            names = parse_fields(fields, ENTRY_LIST_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        query = select(*entry_columns(names)).where(Entry.user_id == user_id)
         
         if entry_type:
             query = query.where(Entry.type == entry_type)
         
-        query = query.order_by(Entry.created_at.desc()).offset(offset).limit(limit)
+        if after:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(after)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(
+                tuple_(Entry.created_at, Entry.id) < tuple_(cursor_created_at, cursor_id),
+                # Redundant bound on the partition key so older pages skip newer partitions
+                Entry.created_at <= cursor_created_at
+            )
+        elif offset:
+            query = query.offset(offset)
+        
+        # Fetch one extra row to know whether another page exists
+        query = query.order_by(Entry.created_at.desc(), Entry.id.desc()).limit(limit + 1)
         
         result = await db.execute(query)
-        entries = result.scalars().all()
+        entries = result.all()
+        
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(entries[-1].created_at, entries[-1].id)
+        
+        # True totals come from the maintained per-user counters
+        counts = await get_counts(db, user_id)
+        if entry_type:
+            total = counts.get(entry_type.value, 0)
+        else:
+            total = counts.get(EntryType.FEEL.value, 0) + counts.get(EntryType.DEVOTION.value, 0)
         
+        store = get_content_store()
         return {
-            "entries": [
-                {
-                    "id": entry.id,
-                    "type": entry.type,
-                    "topic": entry.topic,
-                    "input_text": entry.input_text,
-                    "response": entry.response_json,
-                    "created_at": entry.created_at
-                }
-                for entry in entries
-            ],
-            "total": len(entries)
+            "entries": [serialize_entry(entry, names, store) for entry in entries],
+            "total": total,
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving entries: {str(e)}")
 
+@router.get("/export")
+async def export_history(
+    user_id: int,
+    fmt: str = Query("ndjson", alias="format")
+):
+    """
+    Export a user's full history (entries, then bookmarks) as NDJSON or CSV
+    
+    The export is streamed from a server-side cursor with chunked transfer
+    encoding, so it works the same for any amount of history. The last
+    record is an end marker with the record count; an export without it
+    was cut short.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {fmt}")
+    
+    records = export_records(user_id, session_factory=await read_sessionmaker(user_id))
+    if fmt == "csv":
+        body, media_type = export_csv(records), "text/csv"
+    else:
+        body, media_type = export_ndjson(records), "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="abide-history-{user_id}.{fmt}"'}
+    )
+
+@router.get("/search")
+async def search_user_entries(
+    user_id: int,
+    q: str,
+    entry_type: Optional[EntryType] = None,
+    limit: int = 20,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Search a user's own entries by their words and topic, best matches first
+    
+    `q` accepts web search syntax: "quoted phrases", -excluded words and `or`.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search text is required")
+    
+    try:
+        names = parse_fields(fields, ENTRY_LIST_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        results = await search_entries(
+            db, user_id, q, names,
+            limit=max(1, min(limit, MAX_SEARCH_RESULTS)),
+            entry_type=entry_type
+        )
+        return {"results": results, "query": q}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching entries: {str(e)}")
+
+@router.get("/changes")
+async def get_history_changes(
+    user_id: int,
+    since: Optional[str] = None,
+    limit: int = 500,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get entries and bookmarks created or deleted since a sync cursor
+    
+    Call without `since` to get a cursor at the current head, load the full
+    history once, then keep passing back `next_cursor`; repeat while
+    `has_more` is true. Removed bookmarks and expired entries come back as
+    `delete` tombstones. Changes may repeat across a bootstrap, so apply them
+    idempotently. A 410 means the cursor is older than the change log and
+    the client has to load its history in full again.
+    """
+    limit = max(1, min(limit, 1000))
+    now = datetime.now(timezone.utc)
+    
+    try:
+        if not since:
+            return {"changes": [], "next_cursor": encode_change_cursor(*await get_head(db), now), "has_more": False}
+        
+        try:
+            xid, change_id, issued_at = decode_change_cursor(since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        retention_days = settings.HISTORY_CHANGES_RETENTION_DAYS
+        if retention_days > 0 and issued_at < now - timedelta(days=retention_days):
+            raise HTTPException(status_code=410, detail="Sync cursor expired, reload history")
+        
+        changes, position, has_more = await get_changes(db, user_id, (xid, change_id), limit)
+        return {
+            "changes": changes,
+            "next_cursor": encode_change_cursor(*position, now),
+            "has_more": has_more
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving changes: {str(e)}")
+
+@router.get("/trends")
+async def get_user_trends(
+    user_id: int,
+    days: int = 30,
+    entry_type: EntryType = EntryType.FEEL,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get the distribution of a user's topics over the last `days` days (e.g. 7, 30 or 365)
+    
+    Reads the daily topic rollups, at most one row per topic per day.
+    """
+    if not 1 <= days <= MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_TREND_DAYS}")
+    
+    try:
+        return await get_trend(db, user_id, days, entry_type.value)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving trends: {str(e)}")
+
 @router.get("/bookmarks")
 async def get_user_bookmarks(
     user_id: int,
     limit: int = 20,
     offset: int = 0,
-    db: AsyncSession = Depends(get_async_db)
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Get user's bookmarked entries
+    
+    `fields` selects which entry fields to load, as for /entries.
     """
     try:
-        query = select(Bookmark, Entry).join(Entry).where(Bookmark.user_id == user_id)
+        try:
+            names = parse_fields(fields, BOOKMARK_ENTRY_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        query = select(
+            Bookmark.id.label("bookmark_id"),
+            Bookmark.created_at.label("bookmarked_at"),
+            *entry_columns(names, prefix="entry_")
+        ).join(Entry, Entry.id == Bookmark.entry_id).where(Bookmark.user_id == user_id)
         query = query.order_by(Bookmark.created_at.desc()).offset(offset).limit(limit)
         
         result = await db.execute(query)
         bookmarks = result.all()
+        counts = await get_counts(db, user_id)
+        store = get_content_store()
         
         return {
             "bookmarks": [
                 {
-                    "id": bookmark.id,
-                    "entry": {
-                        "id": entry.id,
-                        "type": entry.type,
-                        "topic": entry.topic,
-                        "response": entry.response_json,
-                        "created_at": entry.created_at
-                    },
-                    "bookmarked_at": bookmark.created_at
+                    "id": bookmark.bookmark_id,
+                    "entry": serialize_entry(bookmark, names, store, prefix="entry_"),
+                    "bookmarked_at": bookmark.bookmarked_at
                 }
-                for bookmark, entry in bookmarks
+                for bookmark in bookmarks
             ],
-            "total": len(bookmarks)
+            "total": counts.get(BOOKMARK, 0)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving bookmarks: {str(e)}")
 
@@ -96,32 +276,20 @@ async def bookmark_entry(
 ):
     """
     Bookmark an entry
+    
+    Idempotent: bookmarking an already bookmarked entry returns the existing bookmark.
     """
     try:
-        # Check if entry exists
-        entry_result = await db.execute(select(Entry).where(Entry.id == entry_id))
-        entry = entry_result.scalar_one_or_none()
+        bookmark_id = await create_bookmark(db, user_id, entry_id)
+        if bookmark_id is not None:
+            return {"message": "Entry bookmarked successfully", "bookmark_id": bookmark_id}
         
-        if not entry:
+        # Nothing inserted: either it was already bookmarked or the entry doesn't exist
+        existing_id = await find_bookmark(db, user_id, entry_id)
+        if existing_id is None:
             raise HTTPException(status_code=404, detail="Entry not found")
         
-        # Check if already bookmarked
-        existing_bookmark = await db.execute(
-            select(Bookmark).where(
-                Bookmark.user_id == user_id,
-                Bookmark.entry_id == entry_id
-            )
-        )
-        
-        if existing_bookmark.scalar_one_or_none():
-            raise HTTPException(status_code=400, detail="Entry already bookmarked")
-        
-        # Create bookmark
-        bookmark = Bookmark(user_id=user_id, entry_id=entry_id)
-        db.add(bookmark)
-        await db.commit()
-        
-        return {"message": "Entry bookmarked successfully", "bookmark_id": bookmark.id}
+        return {"message": "Entry already bookmarked", "bookmark_id": existing_id}
         
     except HTTPException:
         raise
@@ -138,24 +306,90 @@ async def remove_bookmark(
     Remove a bookmark
     """
     try:
-        # Find and delete bookmark
-        bookmark_result = await db.execute(
-            select(Bookmark).where(
-                Bookmark.id == bookmark_id,
-                Bookmark.user_id == user_id
-            )
-        )
-        bookmark = bookmark_result.scalar_one_or_none()
-        
-        if not bookmark:
+        if not await delete_bookmark(db, user_id, bookmark_id):
             raise HTTPException(status_code=404, detail="Bookmark not found")
         
-        await db.delete(bookmark)
-        await db.commit()
-        
         return {"message": "Bookmark removed successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error removing bookmark: {str(e)}")
+
+async def _run_bookmark_batch(
+    action: str,
+    operation: Callable[[AsyncSession, int, List[int]], Awaitable[List[Dict]]],
+    request: BookmarkBatchRequest,
+    idempotency_key: Optional[str],
+    db: AsyncSession,
+    error_context: str
+) -> Response:
+    """
+    Run a bulk bookmark operation, replaying the stored results for a repeated Idempotency-Key
+    """
+    if len(request.entry_ids) > settings.MAX_BOOKMARK_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds limit of {settings.MAX_BOOKMARK_BATCH_SIZE}"
+        )
+    
+    # Keys are scoped per action and user, so clients can't collide with each other
+    idempotency = None
+    if idempotency_key:
+        idempotency = IdempotentRequest(
+            f"{action}:{request.user_id}",
+            idempotency_key,
+            request_fingerprint(*map(str, request.entry_ids))
+        )
+    
+    try:
+        if idempotency:
+            stored = await idempotency.begin()
+            if stored is not None:
+                return Response(content=stored, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+        
+        results = await operation(db, request.user_id, request.entry_ids)
+        body = json.dumps({"results": results})
+        
+        if idempotency:
+            await idempotency.complete(body)
+        
+        return Response(content=body, media_type="application/json")
+        
+    except IdempotencyError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error {error_context}: {str(e)}")
+    finally:
+        # Frees the key if the request failed or was cancelled; a no-op once the response is stored
+        if idempotency:
+            await idempotency.release()
+
+@router.post("/bookmarks/bulk", response_model=BookmarkBatchResponse)
+async def bulk_bookmark_entries(
+    request: BookmarkBatchRequest,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Bookmark many entries with one statement
+    
+    Each entry gets a status: created, exists or not_found. Send an Idempotency-Key
+    header to make retries safe; a retry with the same key gets the original results.
+    """
+    return await _run_bookmark_batch("bookmarks:add", create_bookmarks, request, idempotency_key, db, "bookmarking entries")
+
+@router.post("/bookmarks/bulk-delete", response_model=BookmarkBatchResponse)
+async def bulk_remove_bookmarks(
+    request: BookmarkBatchRequest,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Remove the user's bookmarks on many entries with one statement
+    
+    Each entry gets a status: deleted or not_found. Accepts an Idempotency-Key header like bulk add.
+    """
+    return await _run_bookmark_batch("bookmarks:remove", delete_bookmarks, request, idempotency_key, db, "removing bookmarks")
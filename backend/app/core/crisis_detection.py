@@ -1,5 +1,7 @@
 import re
+from bisect import bisect_right
 from typing import List, Dict
+from app.core.metrics import timed
 
 class CrisisDetector:
     """Detects crisis indicators in user input and provides appropriate responses"""
@@ -65,7 +67,11 @@ class CrisisDetector:
                 }
             ]
         }
+        
+        # Compiled on first batch screen
+        self._indicator_pattern = None
     
+    @timed("crisis")
     def detect_crisis(self, text: str) -> bool:
         """Detect if the input text contains crisis indicators"""
         if not text:
@@ -80,6 +86,29 @@ class CrisisDetector:
         
         return False
     
+    @timed("crisis")
+    def detect_crisis_batch(self, texts: List[str]) -> List[bool]:
+        """Detect crisis indicators in many texts with a single regex pass over the joined batch"""
+        if self._indicator_pattern is None:
+            indicators = [indicator for group in self.crisis_indicators.values() for indicator in group]
+            self._indicator_pattern = re.compile("|".join(re.escape(indicator) for indicator in indicators))
+        
+        lowered = [text.lower() if text else "" for text in texts]
+        joined = "\x00".join(lowered)
+        
+        # Offset where each text starts in the joined string
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + 1
+        
+        flagged = [False] * len(texts)
+        for match in self._indicator_pattern.finditer(joined):
+            flagged[bisect_right(starts, match.start()) - 1] = True
+        
+        return flagged
+    
     def get_crisis_type(self, text: str) -> str:
         """Determine the type of crisis detected"""
         if not text:
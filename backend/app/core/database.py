@@ -1,52 +1,120 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import text
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 import asyncio
-from typing import AsyncGenerator
+import logging
+import time
+from typing import AsyncGenerator, Iterable, Optional
 from app.core.config import settings
+from app.core.pool import InstrumentedAsyncPool
+from app.core.metrics import timed
+
+logger = logging.getLogger("abide")
 
 # Database URL for async operations
 ASYNC_DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
+def _async_engine_options() -> dict:
+    """Pool and driver options shared by the primary and replica engines"""
+    return {
+        "echo": settings.DB_ECHO,
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        "connect_args": {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    }
+
 # Create async engine
-async_engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=settings.ENVIRONMENT == "development",
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_options())
 
-# Create sync engine for migrations
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.ENVIRONMENT == "development",
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+# Optional read replica engine with its own pool
+async_read_engine = None
+if settings.DATABASE_READ_URL:
+    async_read_engine = create_async_engine(
+        settings.DATABASE_READ_URL.replace("postgresql://", "postgresql+asyncpg://"),
+        **_async_engine_options(),
+    )
+
+# Sync engine for migrations and scripts, created on first use
+_engine: Optional[Engine] = None
+
+def get_sync_engine() -> Engine:
+    """Get the sync engine, creating it (and importing its driver) on first use"""
+    global _engine
+    
+    if _engine is None:
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            echo=settings.DB_ECHO,
+            pool_pre_ping=True,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    
+    return _engine
+
+class TimedAsyncSession(AsyncSession):
+    """AsyncSession that records statement and commit time as request stages"""
+    
+    async def execute(self, *args, **kwargs):
+        with timed("db_query"):
+            return await super().execute(*args, **kwargs)
+    
+    async def commit(self) -> None:
+        with timed("db_commit"):
+            await super().commit()
 
 # Session factories
 AsyncSessionLocal = sessionmaker(
-    async_engine, class_=AsyncSession, expire_on_commit=False
+    async_engine, class_=TimedAsyncSession, expire_on_commit=False
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncReadSessionLocal = sessionmaker(
+    async_read_engine or async_engine, class_=TimedAsyncSession, expire_on_commit=False
+)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 # Base class for models
 Base = declarative_base()
 
-# Redis client
-redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+class TimedRedis(Redis):
+    """Redis client that records each command's round trip as a request stage"""
+    
+    def execute_command(self, *args, **options):
+        with timed("redis"):
+            return super().execute_command(*args, **options)
+
+class TimedAsyncRedis(AsyncRedis):
+    """Async Redis client that records each command's round trip as a request stage"""
+    
+    async def execute_command(self, *args, **options):
+        with timed("redis"):
+            return await super().execute_command(*args, **options)
+
+# Redis clients; request handlers use the async one so a round trip never blocks the event loop
+redis_client = TimedRedis.from_url(settings.REDIS_URL, decode_responses=True)
+async_redis_client = TimedAsyncRedis.from_url(settings.REDIS_URL, decode_responses=True)
 
 async def init_db():
     """Initialize database tables"""
     async with async_engine.begin() as conn:
         # Import all models to ensure they're registered
-        from app.models import user, entry, bookmark
+        from app.models import user, entry, bookmark, counter, topic_day, change
         
         # Create tables
         await conn.run_sync(Base.metadata.create_all)
+        
+        # Monthly entries partitions for now and the near future
+        from app.core.partitions import ensure_entry_partitions
+        await ensure_entry_partitions(conn, settings.ENTRY_PARTITION_MONTHS_AHEAD)
 
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency to get async database session"""
@@ -56,9 +124,122 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+class LazyAsyncSession:
+    """
+    Stand-in for an AsyncSession that creates the real session on first use
+    
+    Requests that never query (guests, crisis responses, cache hits) skip
+    session setup and teardown entirely; connections are only checked out
+    from the pool once a statement runs.
+    """
+    
+    def __init__(self, session_factory: sessionmaker = AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+    
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+    
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._session_factory()
+        return getattr(self._session, name)
+    
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+async def get_lazy_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async database session that is only opened if used"""
+    session = LazyAsyncSession()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+async def mark_recent_write(user_ids: Iterable[Optional[int]]) -> None:
+    """Pin the users' reads to the primary until the replica has caught up with their writes"""
+    if async_read_engine is None:
+        return
+    
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            for user_id in set(user_ids):
+                if user_id:
+                    pipe.setex(f"recent_write:{user_id}", settings.READ_AFTER_WRITE_WINDOW, 1)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("Failed to record recent write: %r", e)
+
+async def has_recent_write(user_id: Optional[int]) -> bool:
+    """Check whether a user wrote within the read-after-write window"""
+    if not user_id:
+        return False
+    
+    try:
+        return bool(await async_redis_client.exists(f"recent_write:{user_id}"))
+    except Exception as e:
+        # Without the marker the primary is the only safe choice
+        logger.warning("Failed to check recent write: %r", e)
+        return True
+
+_replica_lag: Optional[float] = None
+_replica_lag_checked_at = 0.0
+
+async def replica_lag() -> Optional[float]:
+    """Replica replay lag in seconds, refreshed at most every REPLICA_LAG_CHECK_INTERVAL"""
+    global _replica_lag, _replica_lag_checked_at
+    
+    now = time.monotonic()
+    if now - _replica_lag_checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _replica_lag
+    _replica_lag_checked_at = now
+    
+    try:
+        async with async_read_engine.connect() as conn:
+            # An idle but caught-up replica has nothing left to replay, so its lag is zero
+            result = await conn.execute(text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            ))
+            lag = result.scalar()
+        _replica_lag = float(lag) if lag is not None else 0.0
+    except Exception as e:
+        logger.warning("Replica lag check failed: %r", e)
+        _replica_lag = None
+    
+    return _replica_lag
+
+async def read_sessionmaker(user_id: Optional[int] = None) -> sessionmaker:
+    """
+    Pick the session factory for a read-only query
+    
+    Reads go to the replica unless there is none, it is unreachable or
+    lagging, or the user wrote within the read-after-write window.
+    """
+    if async_read_engine is None or await has_recent_write(user_id):
+        return AsyncSessionLocal
+    
+    lag = await replica_lag()
+    if lag is None or lag > settings.REPLICA_MAX_LAG:
+        return AsyncSessionLocal
+    
+    return AsyncReadSessionLocal
+
+async def get_async_read_db(user_id: Optional[int] = None) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get a database session for read-only queries"""
+    session_factory = await read_sessionmaker(user_id)
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 def get_db() -> Session:
     """Dependency to get sync database session"""
-    db = SessionLocal()
+    db = SessionLocal(bind=get_sync_engine())
     try:
         yield db
     finally:
@@ -67,5 +248,9 @@ def get_db() -> Session:
 async def close_db():
     """Close database connections"""
     await async_engine.dispose()
-    engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
     redis_client.close()
+    await async_redis_client.aclose()
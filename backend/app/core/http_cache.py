@@ -0,0 +1,93 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from fastapi import Request
+from app.core.config import settings
+
+
+def response_seed(key: str, user_id: Optional[int] = None, day: Optional[str] = None) -> str:
+    """
+    Build a selection seed that is stable for the same input, user and UTC day
+
+    Args:
+        key: Normalized request input (feeling text or theme)
+        user_id: Optional user ID so different users can get different selections
+        day: Optional ISO date, defaults to today in UTC
+
+    Returns:
+        Hex seed string suitable for random.Random
+    """
+    if day is None:
+        day = datetime.now(timezone.utc).date().isoformat()
+
+    material = f"{key}|{user_id if user_id is not None else 'guest'}|{day}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def make_etag(*parts: str, weak: bool = False) -> str:
+    """Build an entity tag from the parts that fully determine a response"""
+    digest = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header matches the entity tag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+
+    return False
+
+
+def post_precondition_status(request: Request, etag: str) -> Optional[int]:
+    """
+    Evaluate If-None-Match for a POST that writes nothing and whose response is deterministic
+
+    Only call this for requests without side effects; a request that writes
+    (a logged-in user's entry) must run and return its ETag on the 200.
+
+    Args:
+        request: Incoming request
+        etag: Entity tag of the response the request would produce
+
+    Returns:
+        304 if the client's copy is current, 412 for `If-None-Match: *` (a
+        representation always exists), or None to run the request
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    if header.strip() == "*":
+        return 412
+    return 304 if is_not_modified(request, etag) else None
+
+
+def seconds_until_midnight() -> int:
+    """Seconds until the current UTC day, and with it the response seed, rolls over"""
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def cache_headers(etag: str, private: bool, max_age: Optional[int] = None) -> Dict[str, str]:
+    """Build ETag and Cache-Control headers for a deterministic response"""
+    if max_age is None:
+        max_age = min(settings.RESPONSE_CACHE_MAX_AGE, seconds_until_midnight())
+
+    scope = "private" if private else "public"
+    return {
+        "ETag": etag,
+        "Cache-Control": f"{scope}, max-age={max_age}",
+    }
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Optional, Union
+from fastapi import Header, HTTPException
+from redis.exceptions import WatchError
+from app.core.config import settings
+from app.core.database import async_redis_client
+
+logger = logging.getLogger("abide")
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    """A request can't run under its idempotency key"""
+    status_code = 409
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    """An idempotency key was sent again with a different request"""
+    status_code = 422
+
+    def __init__(self):
+        super().__init__("Idempotency-Key was already used for a different request")
+
+
+class IdempotencyKeyInProgress(IdempotencyError):
+    """The first request with an idempotency key is still running"""
+    status_code = 409
+
+    def __init__(self):
+        super().__init__("A request with this Idempotency-Key is still in progress")
+
+
+def get_idempotency_key(idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")) -> Optional[str]:
+    """Dependency to read and validate the optional Idempotency-Key header"""
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+        )
+    return idempotency_key
+
+
+def request_fingerprint(*parts: str) -> str:
+    """Hash the parts that identify a request, so a reused key can be told apart from a retry"""
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def idempotency_id(scope: str, key: str) -> str:
+    """Build the Redis key for a client's idempotency key within an endpoint scope"""
+    return f"idempotency:{scope}:{key}"
+
+
+class IdempotentRequest:
+    """
+    One request's claim on an idempotency key
+
+    The first request with a key stores an in-flight marker and runs; it then
+    stores its serialized response, which later copies replay. Copies that
+    arrive while it runs poll until the response is stored, or take over the
+    key if the first request gave it up or its marker expired. Each claim's
+    marker carries a token, and the response is stored or the marker removed
+    only while the marker is still this claim's, so a request that outlives
+    IDEMPOTENCY_LOCK_TTL can't remove a later copy's claim. If Redis is
+    unavailable, requests run normally.
+    """
+
+    def __init__(self, scope: str, key: str, fingerprint: str):
+        self.id = idempotency_id(scope, key)
+        self.fingerprint = fingerprint
+        self.marker: Optional[str] = None
+
+    @property
+    def claimed(self) -> bool:
+        return self.marker is not None
+
+    def _parse(self, stored: Optional[str]) -> Optional[dict]:
+        if stored is None:
+            return None
+
+        record = json.loads(stored)
+        if record["fingerprint"] != self.fingerprint:
+            raise IdempotencyKeyReused()
+        return record
+
+    async def begin(self) -> Optional[str]:
+        """
+        Claim the key, or wait for the request that holds it
+
+        Returns:
+            Stored response body to replay, or None if the caller should run the request
+
+        Raises:
+            IdempotencyKeyReused: If the key was used for a different request
+            IdempotencyKeyInProgress: If the first request doesn't finish within IDEMPOTENCY_WAIT_TIMEOUT
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        delay = 0.05
+        while True:
+            try:
+                record = self._parse(await async_redis_client.get(self.id))
+                if record is None:
+                    marker = json.dumps({"fingerprint": self.fingerprint, "body": None, "token": uuid.uuid4().hex})
+                    # The marker expires so a crashed request can't hold the key forever
+                    if await async_redis_client.set(self.id, marker, nx=True, ex=settings.IDEMPOTENCY_LOCK_TTL):
+                        self.marker = marker
+                        return None
+                    continue
+            except IdempotencyError:
+                raise
+            except Exception as e:
+                # Without the store the request runs normally; retries are then only as safe as the endpoint
+                logger.warning("Idempotency lookup failed: %r", e)
+                return None
+
+            if record["body"] is not None:
+                return record["body"]
+
+            if time.monotonic() + delay > deadline:
+                raise IdempotencyKeyInProgress()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def _replace_own_marker(self, value: Optional[str]) -> bool:
+        """
+        Replace this claim's marker with `value`, or delete it if None, unless another claim owns the key
+
+        Returns:
+            False if the marker was no longer this claim's
+        """
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(self.id)
+                    if await pipe.get(self.id) != self.marker:
+                        await pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    if value is None:
+                        pipe.delete(self.id)
+                    else:
+                        pipe.setex(self.id, settings.IDEMPOTENCY_TTL, value)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    # The key changed between the read and the write; check ownership again
+                    continue
+
+    async def complete(self, body: Union[str, bytes]) -> None:
+        """Store the response for replay to retries of the same request"""
+        if not self.claimed:
+            return
+
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        try:
+            stored = await self._replace_own_marker(json.dumps({"fingerprint": self.fingerprint, "body": body}))
+            if not stored:
+                logger.warning("Idempotency claim on %s expired before the response was stored", self.id)
+        except Exception as e:
+            logger.warning("Failed to store idempotent response: %r", e)
+        self.marker = None
+
+    async def release(self) -> None:
+        """Give up the key after a failed request so a retry can run it again"""
+        if not self.claimed:
+            return
+
+        try:
+            await self._replace_own_marker(None)
+        except Exception as e:
+            logger.warning("Failed to release idempotency key: %r", e)
+        self.marker = None
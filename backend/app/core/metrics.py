@@ -0,0 +1,153 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_DURATION = Histogram(
+    "abide_http_request_duration_seconds",
+    "Time to the response headers, by route",
+    ["method", "route", "status"],
+)
+
+STAGE_DURATION = Histogram(
+    "abide_stage_duration_seconds",
+    "Time spent in each request stage",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+CACHE_REQUESTS = Counter(
+    "abide_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+
+# Stage name -> [total seconds, calls] for the current request, None outside a request
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_timings", default=None)
+
+# Labelled histograms per stage; labels() takes a lock on every call
+_stage_histograms: Dict[str, Histogram] = {}
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration in the metrics and in the current request's timings"""
+    histogram = _stage_histograms.get(stage)
+    if histogram is None:
+        histogram = _stage_histograms[stage] = STAGE_DURATION.labels(stage)
+    histogram.observe(seconds)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        totals = timings.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class timed:
+    """
+    Time a stage, as a context manager or as a decorator for sync and async functions
+
+    Example:
+        with timed("bible"):
+            verses = await provider.get_random_verses(topic)
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.stage, time.perf_counter() - self.started)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        # Each call keeps its own start time, so a decorated function can run concurrently
+        stage = self.stage
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record_stage(stage, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - started)
+        return wrapper
+
+
+def start_request_timings() -> Dict[str, List[float]]:
+    """Start collecting stage timings for the current request"""
+    timings: Dict[str, List[float]] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: Dict[str, List[float]], total: float) -> str:
+    """
+    Format stage timings as a Server-Timing header value
+
+    Args:
+        timings: Stage name -> [total seconds, calls]
+        total: Time to the response headers in seconds
+
+    Returns:
+        Header value such as `bible;dur=1.20, redis;dur=0.40;desc="3 calls", total;dur=4.10`
+    """
+    metrics = []
+    for stage, (seconds, calls) in timings.items():
+        metric = f"{stage};dur={seconds * 1000:.2f}"
+        if calls > 1:
+            metric += f';desc="{calls} calls"'
+        metrics.append(metric)
+    metrics.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(metrics)
+
+
+class StatsCollector:
+    """Expose the numeric values of stats() dictionaries as gauges, read at scrape time"""
+
+    def __init__(self, prefix: str, label: str, sources: Dict[str, Callable[[], Optional[Dict]]]):
+        """
+        Args:
+            prefix: Metric name prefix, e.g. abide_db_pool
+            label: Label that tells the sources apart, e.g. pool
+            sources: Label value -> function returning stats, or None when unavailable
+        """
+        self.prefix = prefix
+        self.label = label
+        self.sources = sources
+
+    def collect(self):
+        families: Dict[str, GaugeMetricFamily] = {}
+        for source, get_stats in self.sources.items():
+            stats = get_stats()
+            if not stats:
+                continue
+            for key, value in stats.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                name = f"{self.prefix}_{key}"
+                if name not in families:
+                    families[name] = GaugeMetricFamily(name, f"{self.prefix} {key}", labels=[self.label])
+                families[name].add_metric([source], value)
+        return iter(families.values())
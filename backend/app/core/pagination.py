@@ -0,0 +1,46 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode the position of the last row on a page as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode an opaque cursor back into (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def encode_change_cursor(xid: int, change_id: int, issued_at: datetime) -> str:
+    """Encode a position in the change log, stamped with when it was issued"""
+    raw = json.dumps([xid, change_id, int(issued_at.timestamp())], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int, datetime]:
+    """
+    Decode a change log cursor back into (xid, change id, issued_at)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        xid, change_id, issued_at = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return int(xid), int(change_id), datetime.fromtimestamp(int(issued_at), tz=timezone.utc)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,146 @@
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger("abide")
+
+ENTRIES_TABLE = "entries"
+DEFAULT_PARTITION = "entries_default"
+PARTITION_PATTERN = re.compile(r"^entries_y(\d{4})m(\d{2})$")
+
+# Serializes partition DDL across workers starting at the same time
+PARTITION_LOCK_KEY = 0x656E7472  # "entr"
+
+# Held for a whole maintenance run, so only one worker or cron job runs it at a time
+MAINTENANCE_LOCK_KEY = 0x6D61696E  # "main"
+
+
+def month_start(day: Optional[date] = None) -> date:
+    """First day of the month containing day, defaulting to today in UTC"""
+    if day is None:
+        day = datetime.now(timezone.utc).date()
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Shift a month start by a number of months"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the entries partition holding a month"""
+    return f"entries_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """Month held by an entries partition, or None for tables that don't follow the naming scheme"""
+    match = PARTITION_PATTERN.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    """Check whether the entries table is partitioned (tables created before partitioning are not)"""
+    result = await conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+    ), {"table": ENTRIES_TABLE})
+    return bool(result.scalar())
+
+
+async def list_entry_partitions(conn: AsyncConnection) -> List[Tuple[str, date]]:
+    """List the monthly entries partitions, oldest first"""
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": ENTRIES_TABLE})
+
+    partitions = []
+    for (name,) in result.all():
+        month = partition_month(name)
+        if month is not None:
+            partitions.append((name, month))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def ensure_entry_partitions(
+    conn: AsyncConnection,
+    months_ahead: int,
+    start: Optional[date] = None,
+) -> List[str]:
+    """
+    Create any missing monthly partitions from start through months_ahead months from now
+
+    A DEFAULT partition catches rows for months without a partition, so
+    inserts keep working if maintenance falls behind. Rows found there are
+    moved into their month's partition as it is created, starting from the
+    oldest month the default partition holds.
+
+    Args:
+        conn: Connection inside a transaction
+        months_ahead: Future months to create beyond the current one
+        start: Optional first month, defaults to the current month
+
+    Returns:
+        Names of the partitions that were created
+    """
+    if not await is_partitioned(conn):
+        return []
+
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {ENTRIES_TABLE} DEFAULT"))
+    existing = {name for name, _ in await list_entry_partitions(conn)}
+
+    month = month_start(start)
+    stranded = (await conn.execute(text(f"SELECT min(created_at) FROM {DEFAULT_PARTITION}"))).scalar()
+    if stranded is not None:
+        month = min(month, month_start(stranded.astimezone(timezone.utc).date()))
+
+    last = add_months(month_start(), months_ahead)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            await _create_partition(conn, name, month)
+            created.append(name)
+        month = add_months(month, 1)
+
+    return created
+
+
+async def _create_partition(conn: AsyncConnection, name: str, month: date) -> None:
+    """Create a month's partition, moving any of its rows out of the default partition first"""
+    # Bounds are UTC month boundaries regardless of the session time zone
+    lower = f"'{month.isoformat()} 00:00:00+00'"
+    upper = f"'{add_months(month, 1).isoformat()} 00:00:00+00'"
+    in_month = f"created_at >= {lower} AND created_at < {upper}"
+
+    stranded = (await conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_month}"))).scalar()
+    if stranded:
+        # The new partition's bounds can't overlap rows left in the default partition
+        logger.warning("Moving %d entries for %s out of the default partition; maintenance fell behind", stranded, name)
+        result = await conn.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        ), {"table": ENTRIES_TABLE})
+        columns = ", ".join(column for (column,) in result.all())
+        await conn.execute(text(
+            f"CREATE TEMP TABLE stranded_entries AS "
+            f"SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {in_month}"
+        ))
+        await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+
+    await conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {ENTRIES_TABLE} FOR VALUES FROM ({lower}) TO ({upper})"
+    ))
+
+    if stranded:
+        await conn.execute(text(f"INSERT INTO {ENTRIES_TABLE} ({columns}) SELECT {columns} FROM stranded_entries"))
+        await conn.execute(text("DROP TABLE stranded_entries"))
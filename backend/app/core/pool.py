@@ -0,0 +1,68 @@
+import time
+from typing import Dict
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout counts, wait time, timeouts and invalidations"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "invalidate", self._on_invalidate)
+        event.listen(self, "soft_invalidate", self._on_invalidate)
+
+    def _do_get(self):
+        # Wait time covers queueing for a free connection and opening overflow connections
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+        self.checkouts += 1
+        return record
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def stats(self) -> Dict:
+        """Live pool state and cumulative checkout metrics"""
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def pool_stats(engine: Engine) -> Dict:
+    """Pool metrics for an engine, or its status line when the pool isn't instrumented"""
+    pool = engine.pool
+    if isinstance(pool, InstrumentedAsyncPool):
+        return pool.stats()
+    return {"status": pool.status()}
@@ -0,0 +1,157 @@
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("abide")
+
+# (function name, file, first line), so every line of a function shares one frame
+Frame = Tuple[str, str, int]
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread
+
+    A daemon thread snapshots the target thread's stack every `interval`
+    seconds and counts identical stacks. Under asyncio the target is the
+    event loop thread, so a profile covers everything the loop ran while it
+    was active, including other requests, and time the loop spent idle
+    waiting on I/O shows up under the selector.
+    """
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.duration = 0.0
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._switch_interval = sys.getswitchinterval()
+
+    def start(self) -> None:
+        """Start sampling the calling thread"""
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        # The sampler can only run when the target releases the GIL, which a busy
+        # thread does every switch interval (5 ms by default); shorten it while sampling
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._sampler = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread to exit"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        sys.setswitchinterval(self._switch_interval)
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                # Root first, as flamegraphs expect
+                self.samples[tuple(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Samples as folded stacks (`root;...;leaf count`), the input format of flamegraph.pl"""
+        lines = [
+            ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            + f" {count}"
+            for stack, count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> Dict:
+        """Samples as a speedscope sampled profile, weighted in seconds"""
+        frames: List[Frame] = []
+        index: Dict[Frame, int] = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append(frame)
+            samples.append([index[frame] for frame in stack])
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": n, "file": f, "line": line} for n, f, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "abide",
+        }
+
+
+def wants_profile(header: Optional[str], token: Optional[str], sample_rate: float) -> bool:
+    """
+    Decide whether to profile a request
+
+    Args:
+        header: X-Profile request header
+        token: Configured admin token; without one the header is ignored
+        sample_rate: Fraction of requests to profile at random
+
+    Returns:
+        True if the header carries the token or the request is sampled
+    """
+    if token and header and hmac.compare_digest(header.encode("utf-8"), token.encode("utf-8")):
+        return True
+    return random.random() < sample_rate
+
+
+def profile_filename(method: str, path: str, elapsed: float, fmt: str) -> str:
+    """Build a sortable, filesystem-safe dump name for a profiled request"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    extension = "speedscope.json" if fmt == "speedscope" else "folded.txt"
+    return f"{stamp}-{method}-{slug}-{elapsed * 1000:.0f}ms.{extension}"
+
+
+def write_profile(sampler: StackSampler, directory: str, filename: str, fmt: str, max_files: int) -> None:
+    """
+    Write a profile and rotate the directory down to the newest `max_files` dumps
+
+    Blocking; run it off the event loop.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            if fmt == "speedscope":
+                json.dump(sampler.speedscope(filename), f, separators=(",", ":"))
+            else:
+                f.write(sampler.folded())
+
+        # Names start with a UTC timestamp, so they sort oldest first
+        dumps = sorted(name for name in os.listdir(directory) if name.endswith((".speedscope.json", ".folded.txt")))
+        for name in dumps[:max(0, len(dumps) - max_files)]:
+            os.remove(os.path.join(directory, name))
+    except OSError as e:
+        logger.warning("Failed to write profile %s: %r", filename, e)
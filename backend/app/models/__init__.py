@@ -1,5 +1,8 @@
 from .user import User
 from .entry import Entry
 from .bookmark import Bookmark
+from .counter import UserCounter
+from .topic_day import UserTopicDay
+from .change import HistoryChange
 
-__all__ = ["User", "Entry", "Bookmark"]
+__all__ = ["User", "Entry", "Bookmark", "UserCounter", "UserTopicDay", "HistoryChange"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -8,12 +8,24 @@ class Bookmark(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    entry_id = Column(Integer, ForeignKey("entries.id"), nullable=False)
+    # No foreign key: entries is partitioned and old partitions are dropped whole,
+    # so the retention job removes bookmarks of expired entries itself
+    entry_id = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # One bookmark per user and entry; also serves lookups by user_id
+    __table_args__ = (
+        Index("uq_bookmarks_user_entry", user_id, entry_id, unique=True),
+        Index("ix_bookmarks_entry_id", entry_id),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="bookmarks")
-    entry = relationship("Entry", back_populates="bookmarks")
+    entry = relationship(
+        "Entry",
+        primaryjoin="foreign(Bookmark.entry_id) == Entry.id",
+        back_populates="bookmarks",
+    )
     
     def __repr__(self):
         return f"<Bookmark(id={self.id}, user_id={self.user_id}, entry_id={self.entry_id})>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class HistoryChange(Base):
+    """Append-only log of created and deleted history rows, read by delta sync"""
+    __tablename__ = "history_changes"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # Id of the writing transaction; changes are served in xid order once every older transaction has finished
+    xid = Column(BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text)::bigint"))
+    user_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # entry, bookmark
+    op = Column(String, nullable=False)  # create, delete
+    object_id = Column(Integer, nullable=False)
+    entry_id = Column(Integer, nullable=True)  # bookmarked entry, for bookmark changes
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_history_changes_user_xid", user_id, xid, id),
+    )
+    
+    def __repr__(self):
+        return f"<HistoryChange(id={self.id}, kind='{self.kind}', op='{self.op}', object_id={self.object_id})>"
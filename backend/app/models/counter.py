@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.core.database import Base
+
+class UserCounter(Base):
+    __tablename__ = "user_counters"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String, primary_key=True)  # feel, devotion, bookmark
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserCounter(user_id={self.user_id}, kind='{self.kind}', count={self.count})>"
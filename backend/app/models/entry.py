@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, Enum, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -8,20 +9,46 @@ class EntryType(str, enum.Enum):
     FEEL = "feel"
     DEVOTION = "devotion"
 
+SEARCH_CONFIG = "english"
+
+def search_vector_expression(row: str = "") -> str:
+    """SQL for an entry's search document; `row` qualifies the columns, e.g. NEW. in a trigger"""
+    return (
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({row}topic, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({row}input_text, '')), 'B')"
+    )
+
+SEARCH_VECTOR_EXPRESSION = search_vector_expression()
+
 class Entry(Base):
     __tablename__ = "entries"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned by created_at month, so the partition key is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for guest users
     type = Column(Enum(EntryType), nullable=False)
     topic = Column(String, nullable=False)
     input_text = Column(Text, nullable=True)  # Nullable for privacy
-    response_json = Column(JSON, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    response_json = Column(JSON, nullable=False)  # Compact references, see app.services.content
+    created_at = Column(DateTime(timezone=True), primary_key=True, nullable=False, server_default=func.now())
+    # Full-text search over the user's own words and the topic, kept current by Postgres on every write
+    search_vector = Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True))
+    
+    # Cover the history listing (newest first per user, optionally by type) for keyset pagination
+    __table_args__ = (
+        Index("ix_entries_user_created", user_id, created_at.desc(), id.desc()),
+        Index("ix_entries_user_type_created", user_id, type, created_at.desc(), id.desc()),
+        Index("ix_entries_search_vector", search_vector, postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
     # Relationships
     user = relationship("User", back_populates="entries")
-    bookmarks = relationship("Bookmark", back_populates="entry")
+    bookmarks = relationship(
+        "Bookmark",
+        primaryjoin="Entry.id == foreign(Bookmark.entry_id)",
+        back_populates="entry",
+    )
     
     def __repr__(self):
         return f"<Entry(id={self.id}, type='{self.type}', topic='{self.topic}')>"
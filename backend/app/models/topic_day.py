@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from app.core.database import Base
+
+class UserTopicDay(Base):
+    """Per-user daily entry counts by topic, maintained as entries are written"""
+    __tablename__ = "user_topic_days"
+    
+    # Primary key order serves range scans over one user's days for one kind
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    kind = Column(String, primary_key=True)  # feel, devotion
+    day = Column(Date, primary_key=True)  # UTC day of the entries
+    topic = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserTopicDay(user_id={self.user_id}, kind='{self.kind}', day={self.day}, topic='{self.topic}', count={self.count})>"
@@ -1,5 +1,6 @@
-from .feeling import FeelingRequest, FeelingResponse
+from .feeling import FeelingRequest, FeelingResponse, FeelingBatchRequest, FeelingBatchResponse
 from .devotion import DevotionRequest, DevotionResponse
+from .bookmark import BookmarkBatchRequest, BookmarkBatchResult, BookmarkBatchResponse
 from .common import Verse, Video, User
 
-__all__ = ["FeelingRequest", "FeelingResponse", "DevotionRequest", "DevotionResponse", "Verse", "Video", "User"]
+__all__ = ["FeelingRequest", "FeelingResponse", "FeelingBatchRequest", "FeelingBatchResponse", "DevotionRequest", "DevotionResponse", "BookmarkBatchRequest", "BookmarkBatchResult", "BookmarkBatchResponse", "Verse", "Video", "User"]
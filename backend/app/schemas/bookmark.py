@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class BookmarkBatchRequest(BaseModel):
+    """Request schema for adding or removing bookmarks on many entries"""
+    user_id: int
+    entry_ids: List[int]
+
+class BookmarkBatchResult(BaseModel):
+    """Outcome for one entry: created, exists, deleted or not_found"""
+    entry_id: int
+    status: str
+    bookmark_id: Optional[int] = None
+
+class BookmarkBatchResponse(BaseModel):
+    """Response schema for a bookmark batch, one result per distinct entry in request order"""
+    results: List[BookmarkBatchResult]
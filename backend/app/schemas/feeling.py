@@ -17,3 +17,11 @@ class FeelingResponse(BaseModel):
     message: Optional[str] = None
     supportive_verses: Optional[List[Verse]] = None
     resources: Optional[List[str]] = None
+
+class FeelingBatchRequest(BaseModel):
+    """Request schema for a batch of feeling inputs"""
+    items: List[FeelingRequest]
+
+class FeelingBatchResponse(BaseModel):
+    """Response schema for a batch of feeling responses, in request order"""
+    results: List[FeelingResponse]
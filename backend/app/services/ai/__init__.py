@@ -1,3 +1,11 @@
 from .response_generator import ResponseGenerator
+from .base import ReflectionBackend
+from .factory import ReflectionBackendFactory, get_reflection_service, close_reflection_service
 
-__all__ = ["ResponseGenerator"]
+__all__ = [
+    "ResponseGenerator",
+    "ReflectionBackend",
+    "ReflectionBackendFactory",
+    "get_reflection_service",
+    "close_reflection_service",
+]
@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+
+class ReflectionBackend(ABC):
+    """Base class for reflection generation backends"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def stream_reflection(self, topic: str, feeling_text: str, max_length: int) -> AsyncIterator[str]:
+        """
+        Stream a pastoral reflection token by token
+
+        Args:
+            topic: Classified topic of the feeling (e.g., "peace", "anxiety")
+            feeling_text: Text describing the user's feeling
+            max_length: Maximum reflection length in characters
+
+        Returns:
+            Async iterator of text chunks
+        """
+        pass
+
+    async def aclose(self) -> None:
+        """Release any resources held by the backend"""
+        pass
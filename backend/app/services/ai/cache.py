@@ -0,0 +1,61 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Filler words that don't change what a feeling is about
+_STOPWORDS = {
+    "a", "about", "am", "an", "and", "been", "feel", "feeling", "feelings", "i", "im",
+    "is", "its", "just", "me", "my", "really", "right", "so", "the", "today", "very", "now",
+}
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def normalize_feeling(feeling_text: str) -> str:
+    """Normalize feeling text so trivially different phrasings share a cache entry"""
+    words = (word.replace("'", "") for word in _WORD_RE.findall(feeling_text.lower()))
+    return " ".join(sorted({word for word in words if word and word not in _STOPWORDS}))
+
+
+class ReflectionCache:
+    """In-process LRU cache of generated reflections with time-based expiry"""
+
+    def __init__(self, max_size: int = 512, ttl: int = 86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+
+    def make_key(self, topic: str, feeling_text: str) -> Tuple[str, str]:
+        """Build the (topic, normalized input hash) cache key"""
+        digest = hashlib.sha256(normalize_feeling(feeling_text).encode("utf-8")).hexdigest()
+        return topic, digest
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        """Get a cached reflection, refreshing its recency"""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+
+        expires_at, reflection = cached
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return reflection
+
+    def set(self, key: Tuple[str, str], reflection: str) -> None:
+        """Cache a reflection, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, reflection)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,82 @@
+from typing import Optional
+from app.core.config import settings
+from app.services.ai.base import ReflectionBackend
+from app.services.ai.cache import ReflectionCache
+from app.services.ai.openai_compatible import OpenAICompatibleBackend
+from app.services.ai.reflection import ReflectionService
+
+
+class ReflectionBackendFactory:
+    """Factory for creating reflection backends based on configuration"""
+
+    @staticmethod
+    def create_backend(backend_type: Optional[str] = None) -> Optional[ReflectionBackend]:
+        """
+        Create a reflection backend instance
+
+        Args:
+            backend_type: Type of backend to create (defaults to config setting)
+
+        Returns:
+            ReflectionBackend instance, or None to serve templates only
+        """
+        if backend_type is None:
+            backend_type = settings.REFLECTION_BACKEND
+
+        if backend_type == "openai":
+            if not settings.OPENAI_API_KEY:
+                # Without a key every call would fail, so stay on templates
+                return None
+            return OpenAICompatibleBackend(
+                api_base=settings.REFLECTION_API_BASE,
+                model=settings.REFLECTION_MODEL,
+                api_key=settings.OPENAI_API_KEY,
+                timeout=settings.REFLECTION_TIMEOUT,
+            )
+        elif backend_type == "local":
+            backend = OpenAICompatibleBackend(
+                api_base=settings.LOCAL_MODEL_URL,
+                model=settings.REFLECTION_MODEL,
+                timeout=settings.REFLECTION_TIMEOUT,
+            )
+            backend.name = "local"
+            return backend
+        else:
+            # Default to static templates
+            return None
+
+    @staticmethod
+    def get_available_backends() -> list:
+        """Get list of available reflection backends"""
+        return ["template", "openai", "local"]
+
+
+_reflection_service: Optional[ReflectionService] = None
+
+
+def get_reflection_service() -> ReflectionService:
+    """Get the process-wide reflection service, creating it on first use"""
+    global _reflection_service
+
+    if _reflection_service is None:
+        _reflection_service = ReflectionService(
+            backend=ReflectionBackendFactory.create_backend(),
+            cache=ReflectionCache(
+                max_size=settings.REFLECTION_CACHE_SIZE,
+                ttl=settings.REFLECTION_CACHE_TTL,
+            ),
+            max_concurrency=settings.REFLECTION_MAX_CONCURRENCY,
+            timeout=settings.REFLECTION_TIMEOUT,
+            max_length=settings.MAX_REFLECTION_LENGTH,
+        )
+
+    return _reflection_service
+
+
+async def close_reflection_service() -> None:
+    """Close the process-wide reflection service"""
+    global _reflection_service
+
+    if _reflection_service is not None:
+        await _reflection_service.aclose()
+        _reflection_service = None
@@ -0,0 +1,102 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+from app.services.ai.response_generator import FEELING_TEMPLATES
+from app.services.bible.public_domain import TOPIC_VERSES, COMMON_VERSES
+
+
+def encode_json(value: Any) -> bytes:
+    """Encode a value exactly as FastAPI's JSONResponse would"""
+    return json.dumps(
+        value,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class ResponseFragments:
+    """Pre-encoded JSON fragments for assembling feeling responses without per-request validation"""
+
+    def __init__(self, feeling_templates: Dict[str, Dict[str, str]], verses: Iterable[Dict]):
+        self._texts: Dict[str, bytes] = {}
+        for topic, template in feeling_templates.items():
+            self._texts[topic] = encode_json(topic)
+            for text in template.values():
+                self._texts[text] = encode_json(text)
+
+        self._verses: Dict[tuple, bytes] = {}
+        for verse in verses:
+            self._verses[self._verse_key(verse)] = self._encode_verse(verse)
+
+    def text(self, value: Optional[str]) -> bytes:
+        """Get the encoded form of a string, using the pre-encoded copy when available"""
+        if value is None:
+            return b"null"
+        encoded = self._texts.get(value)
+        return encoded if encoded is not None else encode_json(value)
+
+    def verse(self, verse: Dict) -> bytes:
+        """Get the encoded form of a verse, using the pre-encoded copy when available"""
+        encoded = self._verses.get(self._verse_key(verse))
+        return encoded if encoded is not None else self._encode_verse(verse)
+
+    def verse_list(self, verses: Optional[List[Dict]]) -> bytes:
+        """Encode a list of verses"""
+        if verses is None:
+            return b"null"
+        return b"[" + b",".join(self.verse(verse) for verse in verses) + b"]"
+
+    def feeling_response(
+        self,
+        verses: List[Dict],
+        reflection: str,
+        prayer: str,
+        topic: str,
+        crisis_detected: bool = False,
+        message: Optional[str] = None,
+        supportive_verses: Optional[List[Dict]] = None,
+        resources: Optional[List[str]] = None,
+    ) -> bytes:
+        """Assemble a FeelingResponse body with the same field order and values as the schema"""
+        return b"".join((
+            b'{"verses":', self.verse_list(verses),
+            b',"reflection":', self.text(reflection),
+            b',"prayer":', self.text(prayer),
+            b',"topic":', self.text(topic),
+            b',"crisis_detected":', b"true" if crisis_detected else b"false",
+            b',"message":', self.text(message),
+            b',"supportive_verses":', self.verse_list(supportive_verses),
+            b',"resources":', encode_json(resources),
+            b"}",
+        ))
+
+    def feeling_batch_response(self, results: List[bytes]) -> bytes:
+        """Assemble a FeelingBatchResponse body from encoded FeelingResponse bodies"""
+        return b'{"results":[' + b",".join(results) + b"]}"
+
+    @staticmethod
+    def _verse_key(verse: Dict) -> tuple:
+        return verse["reference"], verse["text"], verse["translation"]
+
+    @staticmethod
+    def _encode_verse(verse: Dict) -> bytes:
+        return encode_json({
+            "reference": verse["reference"],
+            "text": verse["text"],
+            "translation": verse["translation"],
+        })
+
+
+_response_fragments: Optional[ResponseFragments] = None
+
+
+def get_response_fragments() -> ResponseFragments:
+    """Get the process-wide response fragments, encoding them on first use"""
+    global _response_fragments
+
+    if _response_fragments is None:
+        verses = [verse for topic_verses in TOPIC_VERSES.values() for verse in topic_verses]
+        _response_fragments = ResponseFragments(FEELING_TEMPLATES, verses + COMMON_VERSES)
+
+    return _response_fragments
@@ -0,0 +1,93 @@
+"""
+Local stand-in for an OpenAI-compatible model server
+
+Serves canned reflections through /v1/chat/completions so the reflection
+backend can be exercised without network access or API keys:
+
+    uvicorn app.services.ai.local_server:app --port 8001
+
+Set REFLECTION_BACKEND=local to point the app at it. LOCAL_MODEL_TOKEN_DELAY
+and LOCAL_MODEL_FIRST_TOKEN_DELAY (seconds) simulate generation latency.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOKEN_DELAY = float(os.getenv("LOCAL_MODEL_TOKEN_DELAY", "0.02"))
+FIRST_TOKEN_DELAY = float(os.getenv("LOCAL_MODEL_FIRST_TOKEN_DELAY", "0.1"))
+
+CANNED_REFLECTIONS = [
+    "God sees exactly where you are today. You don't have to carry this alone; bring it to Him and rest in His steady love.",
+    "Whatever this moment holds, the Lord is near. Breathe, remember His promises, and let His peace meet you right here.",
+    "Your feelings matter to God. He is patient with you, He is with you, and His faithfulness does not change.",
+]
+
+app = FastAPI(title="Abide local model stand-in")
+
+
+def _pick_reflection(messages: list) -> str:
+    """Pick a canned reflection deterministically from the conversation"""
+    user_text = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    digest = hashlib.sha256(user_text.encode("utf-8")).digest()
+    return CANNED_REFLECTIONS[digest[0] % len(CANNED_REFLECTIONS)]
+
+
+def _chunk(completion_id: str, model: str, content: str, finish_reason=None) -> str:
+    """Encode a streamed completion chunk as a server-sent event"""
+    delta = {"content": content} if content else {}
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "local-stand-in")
+    reflection = _pick_reflection(body.get("messages", []))
+    completion_id = f"chatcmpl-local-{int(time.time() * 1000)}"
+
+    if not body.get("stream"):
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reflection},
+                "finish_reason": "stop",
+            }],
+        })
+
+    async def event_stream():
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        for token in re.findall(r"\S+\s*", reflection):
+            yield _chunk(completion_id, model, token)
+            await asyncio.sleep(TOKEN_DELAY)
+        yield _chunk(completion_id, model, "", finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "abide-local-model"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("LOCAL_MODEL_PORT", "8001")))
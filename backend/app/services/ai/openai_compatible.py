@@ -0,0 +1,62 @@
+import json
+import httpx
+from typing import AsyncIterator, Optional
+from app.services.ai.base import ReflectionBackend
+
+
+class OpenAICompatibleBackend(ReflectionBackend):
+    """Streams reflections from an OpenAI-compatible chat completions API"""
+
+    name = "openai"
+
+    def __init__(self, api_base: str, model: str, api_key: Optional[str] = None, timeout: float = 8.0):
+        self.api_base = api_base.rstrip("/")
+        self.model = model
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        # One pooled client per process so concurrent requests reuse connections
+        self.client = httpx.AsyncClient(headers=headers, timeout=timeout)
+
+    async def stream_reflection(self, topic: str, feeling_text: str, max_length: int) -> AsyncIterator[str]:
+        """Stream reflection chunks from the chat completions endpoint"""
+        payload = {
+            "model": self.model,
+            "stream": True,
+            "temperature": 0.7,
+            "max_tokens": max(16, max_length // 3),
+            "messages": [
+                {"role": "system", "content": self._build_system_prompt(topic, max_length)},
+                {"role": "user", "content": feeling_text},
+            ],
+        }
+
+        async with self.client.stream("POST", f"{self.api_base}/chat/completions", json=payload) as response:
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def _build_system_prompt(self, topic: str, max_length: int) -> str:
+        """Build the pastoral system prompt for a topic"""
+        return (
+            "You are a gentle, encouraging Christian companion. "
+            f"Write a short pastoral reflection for someone whose feelings relate to {topic}. "
+            f"Use at most {max_length} characters, speak warmly in the second person, "
+            "point to God's presence and promises, and never give medical or clinical advice."
+        )
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+from app.services.ai.base import ReflectionBackend
+from app.services.ai.cache import ReflectionCache
+
+logger = logging.getLogger("abide")
+
+
+def clip_reflection(text: str, max_length: int) -> str:
+    """Clip text to max_length characters, preferring to break at a word boundary"""
+    if len(text) <= max_length:
+        return text
+
+    clipped = text[:max_length]
+    boundary = clipped.rfind(" ")
+    if boundary > 0:
+        clipped = clipped[:boundary]
+    return clipped.rstrip(" ,;:-")
+
+
+class ReflectionService:
+    """Runs a reflection backend with caching, concurrency limits, timeouts and template fallback"""
+
+    def __init__(
+        self,
+        backend: Optional[ReflectionBackend],
+        cache: ReflectionCache,
+        max_concurrency: int = 4,
+        timeout: float = 8.0,
+        max_length: int = 160,
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.timeout = timeout
+        self.max_length = max_length
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name if self.backend else "template"
+
+    async def stream(self, topic: str, feeling_text: str, fallback: str) -> AsyncIterator[str]:
+        """
+        Stream a reflection for a feeling
+
+        Args:
+            topic: Classified topic of the feeling
+            feeling_text: Text describing the user's feeling
+            fallback: Template reflection used when generation is unavailable
+
+        Returns:
+            Async iterator of reflection chunks
+        """
+        if self.backend is None:
+            yield fallback
+            return
+
+        key = self.cache.make_key(topic, feeling_text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        # Waiting for a slot counts against the same deadline as generation
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Reflection backend saturated, using template for topic %s", topic)
+            yield fallback
+            return
+
+        chunks = []
+        length = 0
+        complete = False
+        tokens = self.backend.stream_reflection(topic, feeling_text, self.max_length)
+
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), remaining)
+                except StopAsyncIteration:
+                    complete = True
+                    break
+
+                if length + len(token) > self.max_length:
+                    token = clip_reflection("".join(chunks) + token, self.max_length)[length:]
+                    if token:
+                        chunks.append(token)
+                        yield token
+                    complete = True
+                    break
+
+                chunks.append(token)
+                length += len(token)
+                yield token
+
+        except Exception as e:
+            logger.warning("Reflection backend %s failed for topic %s: %r", self.backend_name, topic, e)
+            # Nothing reached the client yet, so the template can stand in cleanly
+            if not chunks:
+                yield fallback
+
+        finally:
+            self._semaphore.release()
+            await tokens.aclose()
+
+        reflection = "".join(chunks).strip()
+        if complete and reflection:
+            self.cache.set(key, reflection)
+
+    async def generate(self, topic: str, feeling_text: str, fallback: str) -> str:
+        """Generate a complete reflection for a feeling"""
+        chunks = [chunk async for chunk in self.stream(topic, feeling_text, fallback)]
+        return "".join(chunks).strip()
+
+    async def aclose(self) -> None:
+        if self.backend:
+            await self.backend.aclose()
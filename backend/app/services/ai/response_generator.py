@@ -1,9 +1,114 @@
+import asyncio
 import json
 import random
-from typing import List, Dict, Optional
+import re
+from bisect import bisect_right
+from typing import AsyncIterator, List, Dict, Optional
 from app.services.bible import BibleProviderFactory
 from app.services.youtube import YouTubeService
+from app.services.ai.factory import get_reflection_service
 from app.core.config import settings
+from app.core.metrics import timed
+
+# Pre-defined response templates for deterministic output
+FEELING_TEMPLATES = {
+    "peace": {
+        "reflection": "In moments when you're seeking peace, remember that God offers a peace that surpasses all understanding. His peace isn't dependent on circumstances but flows from His presence in your life. When you feel overwhelmed, take a moment to breathe and remember that He is with you, holding you in His loving arms.",
+        "prayer": "Lord, please fill this person's heart with Your perfect peace. Help them to rest in Your presence and trust in Your care. Amen."
+    },
+    "hope": {
+        "reflection": "Hope is not just wishful thinking—it's a confident expectation based on God's promises. Even when life feels dark, God's light never goes out. He has plans for your good and a future filled with hope. Hold onto His promises, for they are true and trustworthy.",
+        "prayer": "Heavenly Father, please renew this person's hope and remind them of Your faithful promises. Help them to see Your light even in difficult times. Amen."
+    },
+    "comfort": {
+        "reflection": "God is close to the brokenhearted and saves those who are crushed in spirit. He doesn't promise that life will be easy, but He does promise to be with you through every trial. His comfort is real and His love is constant, even when you can't feel it.",
+        "prayer": "Lord, please wrap this person in Your loving arms and bring them the comfort only You can provide. Help them to feel Your presence. Amen."
+    },
+    "strength": {
+        "reflection": "God doesn't call you to be strong on your own—He calls you to rely on His strength. When you feel weak, that's when His power is made perfect in you. He gives strength to the weary and increases the power of the weak. Trust in His strength, not your own.",
+        "prayer": "Father, please fill this person with Your strength and power. Help them to rely on You and find their strength in You alone. Amen."
+    },
+    "love": {
+        "reflection": "God's love for you is unconditional and never-ending. Nothing can separate you from His love—not your mistakes, not your doubts, not even your feelings. He loved you before you were born and will love you for all eternity. Rest in that love.",
+        "prayer": "Lord, please help this person to truly understand and feel Your deep, abiding love. Let them rest in the security of Your love. Amen."
+    },
+    "gratitude": {
+        "reflection": "Gratitude is a powerful practice that shifts our focus from what we lack to what we have. Every good gift comes from God, and when we recognize His blessings, our hearts overflow with thankfulness. Gratitude opens our eyes to see God's goodness all around us.",
+        "prayer": "Father, thank You for all Your blessings. Help this person to see Your goodness and respond with a grateful heart. Amen."
+    },
+    "anxiety": {
+        "reflection": "Anxiety often comes from trying to control things that are beyond our control. God invites you to cast all your cares on Him because He cares for you. He holds the future in His hands, and He is working all things for your good. Trust Him with your worries.",
+        "prayer": "Lord, please calm this person's anxious heart and help them to trust You with their concerns. Give them Your peace that passes understanding. Amen."
+    },
+    "loneliness": {
+        "reflection": "Even in your loneliest moments, you are never truly alone. God is always with you, and He understands what it feels like to be alone. He promises to never leave you or forsake you. His presence is real, even when you can't feel it.",
+        "prayer": "Father, please remind this person that You are always with them. Help them to feel Your loving presence and know they are never alone. Amen."
+    }
+}
+
+# Devotion templates
+DEVOTION_TEMPLATES = {
+    "peace": {
+        "opening_prayer": "Lord, as we begin this time with You, please quiet our hearts and minds. Help us to focus on Your presence and receive Your peace. Amen.",
+        "reflection": "Peace is not the absence of trouble, but the presence of God in the midst of trouble. When we focus on God's character and promises rather than our circumstances, we can experience His peace that surpasses all understanding. This peace guards our hearts and minds, protecting us from anxiety and fear.",
+        "action_steps": [
+            "Take 5 deep breaths, focusing on God's presence with each breath",
+            "Write down one thing you're worried about and give it to God in prayer"
+        ],
+        "closing_prayer": "Father, thank You for Your peace that guards our hearts. Help us to carry this peace with us throughout our day. Amen."
+    },
+    "hope": {
+        "opening_prayer": "Heavenly Father, open our hearts to receive Your hope today. Help us to see beyond our current circumstances to Your promises. Amen.",
+        "reflection": "Hope is an anchor for our souls, keeping us steady in life's storms. God's hope is not wishful thinking but confident expectation based on His character and promises. When we place our hope in God, we can face any challenge with confidence, knowing He is working for our good.",
+        "action_steps": [
+            "Read one of today's verses aloud and reflect on what it reveals about God's character",
+            "Write down one way you can share hope with someone else today"
+        ],
+        "closing_prayer": "Lord, thank You for the hope we have in You. Help us to share this hope with others. Amen."
+    },
+    "comfort": {
+        "opening_prayer": "God of all comfort, be with us in this time. Wrap us in Your loving arms and bring us the comfort only You can provide. Amen.",
+        "reflection": "God comforts us in our affliction so that we can comfort others. His comfort is not just for our benefit but equips us to be His hands and feet to those around us. When we receive God's comfort, we become channels of His love to others who are hurting.",
+        "action_steps": [
+            "Reflect on a time when God comforted you and thank Him for it",
+            "Consider who in your life might need comfort and how you can offer it"
+        ],
+        "closing_prayer": "Father, thank You for Your comfort. Help us to be comforters to others. Amen."
+    }
+}
+
+
+# Themes offered to clients for devotions
+DEVOTION_THEMES = [
+    "peace", "hope", "comfort", "strength", "love", 
+    "gratitude", "anxiety", "loneliness", "forgiveness"
+]
+
+
+# Keyword mappings for classifying feelings, in priority order
+KEYWORD_MAPPINGS = {
+    "peace": ["peace", "calm", "tranquil", "serene", "relaxed", "at ease"],
+    "hope": ["hope", "hopeful", "optimistic", "encouraged", "inspired"],
+    "comfort": ["comfort", "comforted", "consoled", "soothed", "eased"],
+    "strength": ["strong", "strength", "powerful", "capable", "confident"],
+    "love": ["love", "loved", "cherished", "valued", "appreciated"],
+    "gratitude": ["grateful", "thankful", "blessed", "appreciative", "thankful"],
+    "anxiety": ["anxious", "worried", "stressed", "nervous", "fearful", "afraid"],
+    "loneliness": ["lonely", "alone", "isolated", "abandoned", "forsaken"],
+    "overwhelmed": ["overwhelmed", "overloaded", "burdened", "stressed", "exhausted"]
+}
+
+KEYWORD_TOPICS = list(KEYWORD_MAPPINGS)
+KEYWORD_PRIORITY = {}
+for _priority, _keywords in enumerate(KEYWORD_MAPPINGS.values()):
+    for _keyword in _keywords:
+        KEYWORD_PRIORITY.setdefault(_keyword, _priority)
+
+# One alternation of every keyword in priority order; the lookahead reports overlapping matches
+KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(KEYWORD_PRIORITY, key=KEYWORD_PRIORITY.get)) + "))"
+)
+
 
 class ResponseGenerator:
     """Generates AI responses for feelings and devotions"""
@@ -11,81 +116,20 @@ class ResponseGenerator:
     def __init__(self):
         self.bible_provider = BibleProviderFactory.create_provider()
         self.youtube_service = YouTubeService()
+        self.reflection_service = get_reflection_service()
         
-        # Pre-defined response templates for deterministic output
-        self.feeling_templates = {
-            "peace": {
-                "reflection": "In moments when you're seeking peace, remember that God offers a peace that surpasses all understanding. His peace isn't dependent on circumstances but flows from His presence in your life. When you feel overwhelmed, take a moment to breathe and remember that He is with you, holding you in His loving arms.",
-                "prayer": "Lord, please fill this person's heart with Your perfect peace. Help them to rest in Your presence and trust in Your care. Amen."
-            },
-            "hope": {
-                "reflection": "Hope is not just wishful thinking—it's a confident expectation based on God's promises. Even when life feels dark, God's light never goes out. He has plans for your good and a future filled with hope. Hold onto His promises, for they are true and trustworthy.",
-                "prayer": "Heavenly Father, please renew this person's hope and remind them of Your faithful promises. Help them to see Your light even in difficult times. Amen."
-            },
-            "comfort": {
-                "reflection": "God is close to the brokenhearted and saves those who are crushed in spirit. He doesn't promise that life will be easy, but He does promise to be with you through every trial. His comfort is real and His love is constant, even when you can't feel it.",
-                "prayer": "Lord, please wrap this person in Your loving arms and bring them the comfort only You can provide. Help them to feel Your presence. Amen."
-            },
-            "strength": {
-                "reflection": "God doesn't call you to be strong on your own—He calls you to rely on His strength. When you feel weak, that's when His power is made perfect in you. He gives strength to the weary and increases the power of the weak. Trust in His strength, not your own.",
-                "prayer": "Father, please fill this person with Your strength and power. Help them to rely on You and find their strength in You alone. Amen."
-            },
-            "love": {
-                "reflection": "God's love for you is unconditional and never-ending. Nothing can separate you from His love—not your mistakes, not your doubts, not even your feelings. He loved you before you were born and will love you for all eternity. Rest in that love.",
-                "prayer": "Lord, please help this person to truly understand and feel Your deep, abiding love. Let them rest in the security of Your love. Amen."
-            },
-            "gratitude": {
-                "reflection": "Gratitude is a powerful practice that shifts our focus from what we lack to what we have. Every good gift comes from God, and when we recognize His blessings, our hearts overflow with thankfulness. Gratitude opens our eyes to see God's goodness all around us.",
-                "prayer": "Father, thank You for all Your blessings. Help this person to see Your goodness and respond with a grateful heart. Amen."
-            },
-            "anxiety": {
-                "reflection": "Anxiety often comes from trying to control things that are beyond our control. God invites you to cast all your cares on Him because He cares for you. He holds the future in His hands, and He is working all things for your good. Trust Him with your worries.",
-                "prayer": "Lord, please calm this person's anxious heart and help them to trust You with their concerns. Give them Your peace that passes understanding. Amen."
-            },
-            "loneliness": {
-                "reflection": "Even in your loneliest moments, you are never truly alone. God is always with you, and He understands what it feels like to be alone. He promises to never leave you or forsake you. His presence is real, even when you can't feel it.",
-                "prayer": "Father, please remind this person that You are always with them. Help them to feel Your loving presence and know they are never alone. Amen."
-            }
-        }
-        
-        # Devotion templates
-        self.devotion_templates = {
-            "peace": {
-                "opening_prayer": "Lord, as we begin this time with You, please quiet our hearts and minds. Help us to focus on Your presence and receive Your peace. Amen.",
-                "reflection": "Peace is not the absence of trouble, but the presence of God in the midst of trouble. When we focus on God's character and promises rather than our circumstances, we can experience His peace that surpasses all understanding. This peace guards our hearts and minds, protecting us from anxiety and fear.",
-                "action_steps": [
-                    "Take 5 deep breaths, focusing on God's presence with each breath",
-                    "Write down one thing you're worried about and give it to God in prayer"
-                ],
-                "closing_prayer": "Father, thank You for Your peace that guards our hearts. Help us to carry this peace with us throughout our day. Amen."
-            },
-            "hope": {
-                "opening_prayer": "Heavenly Father, open our hearts to receive Your hope today. Help us to see beyond our current circumstances to Your promises. Amen.",
-                "reflection": "Hope is an anchor for our souls, keeping us steady in life's storms. God's hope is not wishful thinking but confident expectation based on His character and promises. When we place our hope in God, we can face any challenge with confidence, knowing He is working for our good.",
-                "action_steps": [
-                    "Read one of today's verses aloud and reflect on what it reveals about God's character",
-                    "Write down one way you can share hope with someone else today"
-                ],
-                "closing_prayer": "Lord, thank You for the hope we have in You. Help us to share this hope with others. Amen."
-            },
-            "comfort": {
-                "opening_prayer": "God of all comfort, be with us in this time. Wrap us in Your loving arms and bring us the comfort only You can provide. Amen.",
-                "reflection": "God comforts us in our affliction so that we can comfort others. His comfort is not just for our benefit but equips us to be His hands and feet to those around us. When we receive God's comfort, we become channels of His love to others who are hurting.",
-                "action_steps": [
-                    "Reflect on a time when God comforted you and thank Him for it",
-                    "Consider who in your life might need comfort and how you can offer it"
-                ],
-                "closing_prayer": "Father, thank You for Your comfort. Help us to be comforters to others. Amen."
-            }
-        }
+        # Templates live at module level so they aren't rebuilt for every request
+        self.feeling_templates = FEELING_TEMPLATES
+        self.devotion_templates = DEVOTION_TEMPLATES
     
-    async def generate_feeling_response(self, feeling_text: str, user_id: Optional[int] = None) -> Dict:
+    async def generate_feeling_response(self, feeling_text: str, user_id: Optional[int] = None, seed: Optional[str] = None) -> Dict:
         """
         Generate a response for a user's feeling
         
         Args:
             feeling_text: Text describing the user's feeling
             user_id: Optional user ID for logging
+            seed: Optional seed for a repeatable verse selection
             
         Returns:
             Dictionary with verses, reflection, prayer, and topic
@@ -94,21 +138,90 @@ class ResponseGenerator:
         topic = self._classify_feeling(feeling_text)
         
         # Get relevant Bible verses
-        verses = await self.bible_provider.get_random_verses(topic, count=2)
+        with timed("bible"):
+            verses = await self.bible_provider.get_random_verses(topic, count=2, seed=seed)
         
-        # Get reflection and prayer from templates
+        # Get reflection and prayer, generating the reflection when a backend is configured
         template = self.feeling_templates.get(topic, self.feeling_templates["comfort"])
+        with timed("reflection"):
+            reflection = await self.reflection_service.generate(topic, feeling_text, template["reflection"])
         
         response = {
             "verses": verses,
-            "reflection": template["reflection"],
+            "reflection": reflection,
             "prayer": template["prayer"],
             "topic": topic
         }
         
         return response
     
-    async def generate_devotion(self, theme: Optional[str] = None, feeling_text: Optional[str] = None, user_id: Optional[int] = None) -> Dict:
+    async def generate_feeling_responses(self, feeling_texts: List[str], seeds: Optional[List[Optional[str]]] = None) -> List[Dict]:
+        """
+        Generate responses for many feelings at once
+        
+        Args:
+            feeling_texts: Texts describing the user's feelings
+            seeds: Optional per-text seeds for repeatable verse selections
+            
+        Returns:
+            List of response dictionaries in the same order as feeling_texts
+        """
+        topics = self._classify_feelings(feeling_texts)
+        with timed("bible"):
+            verse_lists = await self.bible_provider.get_random_verses_batch(topics, count=2, seeds=seeds)
+        templates = [self.feeling_templates.get(topic, self.feeling_templates["comfort"]) for topic in topics]
+        
+        # Reflections run concurrently; the reflection service bounds backend concurrency
+        with timed("reflection"):
+            reflections = await asyncio.gather(*(
+                self.reflection_service.generate(topic, text, template["reflection"])
+                for topic, text, template in zip(topics, feeling_texts, templates)
+            ))
+        
+        return [
+            {
+                "verses": verses,
+                "reflection": reflection,
+                "prayer": template["prayer"],
+                "topic": topic
+            }
+            for topic, verses, template, reflection in zip(topics, verse_lists, templates, reflections)
+        ]
+    
+    async def stream_feeling_response(self, feeling_text: str, user_id: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Stream a response for a user's feeling
+        
+        Args:
+            feeling_text: Text describing the user's feeling
+            user_id: Optional user ID for logging
+            
+        Returns:
+            Async iterator of events: one "meta" event with verses and topic,
+            "token" events with reflection text, and a final "done" event
+            carrying the complete response
+        """
+        topic = self._classify_feeling(feeling_text)
+        with timed("bible"):
+            verses = await self.bible_provider.get_random_verses(topic, count=2)
+        template = self.feeling_templates.get(topic, self.feeling_templates["comfort"])
+        
+        yield {"event": "meta", "topic": topic, "verses": verses}
+        
+        chunks = []
+        async for chunk in self.reflection_service.stream(topic, feeling_text, template["reflection"]):
+            chunks.append(chunk)
+            yield {"event": "token", "text": chunk}
+        
+        yield {
+            "event": "done",
+            "verses": verses,
+            "reflection": "".join(chunks).strip(),
+            "prayer": template["prayer"],
+            "topic": topic
+        }
+    
+    async def generate_devotion(self, theme: Optional[str] = None, feeling_text: Optional[str] = None, user_id: Optional[int] = None, seed: Optional[str] = None) -> Dict:
         """
         Generate a 10-minute devotion plan
         
@@ -116,22 +229,20 @@ class ResponseGenerator:
             theme: Optional specific theme
             feeling_text: Optional feeling text to derive theme from
             user_id: Optional user ID for logging
+            seed: Optional seed for a repeatable theme and scripture selection
             
         Returns:
             Dictionary with devotion plan and YouTube video
         """
         # Determine theme
-        if not theme:
-            if feeling_text:
-                theme = self._classify_feeling(feeling_text)
-            else:
-                theme = random.choice(list(self.devotion_templates.keys()))
+        theme = self.resolve_theme(theme, feeling_text, seed)
         
         # Get devotion template
         template = self.devotion_templates.get(theme, self.devotion_templates["peace"])
         
         # Get relevant Bible verses
-        scriptures = await self.bible_provider.get_random_verses(theme, count=3)
+        with timed("bible"):
+            scriptures = await self.bible_provider.get_random_verses(theme, count=3, seed=seed)
         
         # Get YouTube video
         video = await self.youtube_service.search_christian_content(theme, max_duration=600)
@@ -150,27 +261,49 @@ class ResponseGenerator:
         
         return devotion
     
+    def resolve_theme(self, theme: Optional[str] = None, feeling_text: Optional[str] = None, seed: Optional[str] = None) -> str:
+        """Resolve the devotion theme from an explicit theme, the feeling text, or a random pick"""
+        if theme:
+            return theme
+        if feeling_text:
+            return self._classify_feeling(feeling_text)
+        
+        rng = random.Random(seed) if seed is not None else random
+        return rng.choice(list(self.devotion_templates.keys()))
+    
+    @timed("classify")
     def _classify_feeling(self, feeling_text: str) -> str:
         """Classify the feeling text into a topic/theme"""
         feeling_lower = feeling_text.lower()
         
-        # Define keyword mappings
-        keyword_mappings = {
-            "peace": ["peace", "calm", "tranquil", "serene", "relaxed", "at ease"],
-            "hope": ["hope", "hopeful", "optimistic", "encouraged", "inspired"],
-            "comfort": ["comfort", "comforted", "consoled", "soothed", "eased"],
-            "strength": ["strong", "strength", "powerful", "capable", "confident"],
-            "love": ["love", "loved", "cherished", "valued", "appreciated"],
-            "gratitude": ["grateful", "thankful", "blessed", "appreciative", "thankful"],
-            "anxiety": ["anxious", "worried", "stressed", "nervous", "fearful", "afraid"],
-            "loneliness": ["lonely", "alone", "isolated", "abandoned", "forsaken"],
-            "overwhelmed": ["overwhelmed", "overloaded", "burdened", "stressed", "exhausted"]
-        }
-        
         # Find the best matching topic
-        for topic, keywords in keyword_mappings.items():
+        for topic, keywords in KEYWORD_MAPPINGS.items():
             if any(keyword in feeling_lower for keyword in keywords):
                 return topic
         
         # Default to comfort if no specific match
         return "comfort"
+    
+    @timed("classify")
+    def _classify_feelings(self, feeling_texts: List[str]) -> List[str]:
+        """Classify many feeling texts with a single regex pass over the joined batch"""
+        lowered = [text.lower() for text in feeling_texts]
+        joined = "\x00".join(lowered)
+        
+        # Offset where each text starts in the joined string
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + 1
+        
+        no_match = len(KEYWORD_TOPICS)
+        best = [no_match] * len(feeling_texts)
+        for match in KEYWORD_PATTERN.finditer(joined):
+            index = bisect_right(starts, match.start()) - 1
+            priority = KEYWORD_PRIORITY[match.group(1)]
+            if priority < best[index]:
+                best[index] = priority
+        
+        # Default to comfort if no specific match
+        return [KEYWORD_TOPICS[priority] if priority < no_match else "comfort" for priority in best]
@@ -34,7 +34,7 @@ class BibleProvider(ABC):
         pass
     
     @abstractmethod
-    async def get_random_verses(self, topic: str, translation: str = "KJV", count: int = 2) -> List[Dict]:
+    async def get_random_verses(self, topic: str, translation: str = "KJV", count: int = 2, seed: Optional[str] = None) -> List[Dict]:
         """
         Get random verses related to a topic
         
@@ -42,12 +42,33 @@ class BibleProvider(ABC):
             topic: Topic or theme (e.g., "peace", "hope", "comfort")
             translation: Bible translation to use
             count: Number of verses to return
+            seed: Optional seed for a repeatable selection
             
         Returns:
             List of verse dictionaries
         """
         pass
     
+    async def get_random_verses_batch(self, topics: List[str], translation: str = "KJV", count: int = 2, seeds: Optional[List[Optional[str]]] = None) -> List[List[Dict]]:
+        """
+        Get random verses for many topics in one call
+        
+        Args:
+            topics: Topics or themes, one per result
+            translation: Bible translation to use
+            count: Number of verses per topic
+            seeds: Optional per-topic seeds for repeatable selections
+            
+        Returns:
+            List of verse lists in the same order as topics
+        """
+        if seeds is None:
+            seeds = [None] * len(topics)
+        return [
+            await self.get_random_verses(topic, translation=translation, count=count, seed=seed)
+            for topic, seed in zip(topics, seeds)
+        ]
+    
     @abstractmethod
     def get_supported_translations(self) -> List[str]:
         """Get list of supported Bible translations"""
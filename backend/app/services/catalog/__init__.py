@@ -0,0 +1,3 @@
+from .devotion_catalog import DevotionCatalog, get_devotion_catalog
+
+__all__ = ["DevotionCatalog", "get_devotion_catalog"]
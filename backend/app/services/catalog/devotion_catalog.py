@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.core.database import async_redis_client
+from app.core.http_cache import response_seed
+from app.schemas.devotion import DevotionResponse
+from app.services.ai.fragments import encode_json
+from app.services.ai.response_generator import ResponseGenerator, DEVOTION_THEMES
+
+logger = logging.getLogger("abide")
+
+REFRESH_LOCK_ID = "devotion_catalog:refresh_lock"
+
+
+class DevotionCatalog:
+    """Precomputed daily devotions per theme, stored as serialized response bodies"""
+
+    def __init__(self, response_generator: Optional[ResponseGenerator] = None):
+        self.response_generator = response_generator or ResponseGenerator()
+        self.themes = list(DEVOTION_THEMES)
+        self.cache_ttl = 2 * 86400  # today's and tomorrow's plans stay available across the rollover
+
+    def catalog_id(self, theme: str, day: Optional[str] = None) -> str:
+        """Build the versioned cache id for a theme's devotion on a day"""
+        if day is None:
+            day = datetime.now(timezone.utc).date().isoformat()
+        return (
+            f"devotion_catalog:v{settings.DEVOTION_CATALOG_VERSION}:"
+            f"{settings.CONTENT_VERSION}:{day}:{theme}"
+        )
+
+    def seed(self, theme: str, day: Optional[str] = None) -> str:
+        """Seed used for a theme's devotion on a day"""
+        return response_seed(theme, None, day)
+
+    def is_cataloged(self, theme: str) -> bool:
+        """Check whether a theme is precomputed"""
+        return theme in self.themes
+
+    async def get(self, theme: str, day: Optional[str] = None) -> Optional[bytes]:
+        """
+        Look up a precomputed devotion
+
+        Args:
+            theme: Devotion theme
+            day: Optional ISO date, defaults to today in UTC
+
+        Returns:
+            Serialized DevotionResponse body, or None on a miss
+        """
+        if not self.is_cataloged(theme):
+            return None
+
+        try:
+            cached = await async_redis_client.get(self.catalog_id(theme, day))
+        except Exception as e:
+            logger.warning("Devotion catalog lookup failed: %r", e)
+            return None
+
+        if cached is None:
+            return None
+        return cached.encode("utf-8") if isinstance(cached, str) else cached
+
+    @staticmethod
+    def serialize(devotion: Dict) -> bytes:
+        """Serialize a devotion as a DevotionResponse body"""
+        return encode_json(jsonable_encoder(DevotionResponse(**devotion)))
+
+    async def put(self, theme: str, body: bytes, day: Optional[str] = None) -> None:
+        """Store a serialized devotion in the catalog"""
+        if not self.is_cataloged(theme):
+            return
+
+        try:
+            await async_redis_client.setex(self.catalog_id(theme, day), self.cache_ttl, body.decode("utf-8"))
+        except Exception as e:
+            logger.warning("Devotion catalog write failed: %r", e)
+
+    async def build(self, theme: str, day: Optional[str] = None) -> bytes:
+        """Generate a theme's devotion for a day and store it in the catalog"""
+        devotion = await self.response_generator.generate_devotion(theme=theme, seed=self.seed(theme, day))
+        body = self.serialize(devotion)
+        await self.put(theme, body, day)
+        return body
+
+    async def precompute(self, day: Optional[str] = None, force: bool = False) -> List[str]:
+        """
+        Precompute every theme's devotion for a day
+
+        Args:
+            day: Optional ISO date, defaults to today in UTC
+            force: Rebuild themes that are already cataloged
+
+        Returns:
+            Themes that were built
+        """
+        built = []
+        for theme in self.themes:
+            if not force and await self.get(theme, day) is not None:
+                continue
+            await self.build(theme, day)
+            built.append(theme)
+        return built
+
+    async def claim_refresh(self, interval: int) -> bool:
+        """
+        Claim this interval's refresh across all workers
+
+        The claim is never released; it expires after `interval`, so one worker
+        refreshes per interval and a worker that dies mid-refresh is replaced
+        by whichever claims the next one.
+        """
+        # The holder is recorded only to show which worker refreshed
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            return bool(await async_redis_client.set(REFRESH_LOCK_ID, owner, nx=True, ex=interval))
+        except Exception as e:
+            logger.warning("Devotion catalog refresh lock failed: %r", e)
+            return False
+
+    async def run_forever(self, interval: int) -> None:
+        """Keep today's and tomorrow's catalogs populated, refreshing from one worker at a time"""
+        while True:
+            today = datetime.now(timezone.utc).date()
+            try:
+                if not await self.claim_refresh(interval):
+                    await asyncio.sleep(interval)
+                    continue
+                for day in (today, today + timedelta(days=1)):
+                    built = await self.precompute(day.isoformat())
+                    if built:
+                        logger.info("Precomputed %d devotions for %s", len(built), day.isoformat())
+            except Exception as e:
+                logger.warning("Devotion catalog refresh failed: %r", e)
+
+            await asyncio.sleep(interval)
+
+
+_devotion_catalog: Optional[DevotionCatalog] = None
+
+
+def get_devotion_catalog() -> DevotionCatalog:
+    """Get the process-wide devotion catalog"""
+    global _devotion_catalog
+
+    if _devotion_catalog is None:
+        _devotion_catalog = DevotionCatalog()
+
+    return _devotion_catalog
+
+
+if __name__ == "__main__":
+    # One-shot refresh for cron: python -m app.services.catalog.devotion_catalog
+    async def _refresh():
+        catalog = get_devotion_catalog()
+        today = datetime.now(timezone.utc).date()
+        for day in (today, today + timedelta(days=1)):
+            built = await catalog.precompute(day.isoformat(), force=True)
+            print(f"Precomputed {len(built)} devotions for {day.isoformat()}")
+
+    asyncio.run(_refresh())
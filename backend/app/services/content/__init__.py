@@ -0,0 +1,3 @@
+from .store import ContentStore, get_content_store
+
+__all__ = ["ContentStore", "get_content_store"]
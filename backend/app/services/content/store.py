@@ -0,0 +1,263 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+from app.models.entry import EntryType
+from app.services.ai.response_generator import FEELING_TEMPLATES, DEVOTION_TEMPLATES
+from app.services.bible.public_domain import TOPIC_VERSES, COMMON_VERSES
+from app.services.youtube.youtube_service import FALLBACK_VIDEOS
+
+# Version of the compact entry format; rows without it are legacy full responses
+COMPACT_FORMAT_VERSION = 1
+
+FEELING_FIELDS = {"verses", "reflection", "prayer", "topic"}
+DEVOTION_FIELDS = {"plan", "video", "theme"}
+DEVOTION_PLAN_FIELDS = {"opening_prayer", "scriptures", "reflection", "action_steps", "closing_prayer"}
+DEVOTION_TEMPLATE_FIELDS = ("opening_prayer", "reflection", "action_steps", "closing_prayer")
+THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
+
+logger = logging.getLogger("abide")
+
+
+class ContentStore:
+    """
+    In-memory index of the static content responses are built from
+
+    Entries store references into this content (template key, verse
+    references, video id) instead of copies of it. Template and verse
+    text should only be changed additively (new keys, new verses), since
+    compact entries are rebuilt from the current content on read.
+    """
+
+    def __init__(
+        self,
+        feeling_templates: Dict[str, Dict[str, str]],
+        devotion_templates: Dict[str, Dict[str, Any]],
+        verses: Iterable[Dict],
+        fallback_videos: Dict[str, Dict],
+    ):
+        self.feeling_templates = feeling_templates
+        self.devotion_templates = devotion_templates
+        self.fallback_videos = fallback_videos
+
+        # A reference with conflicting texts can't be rebuilt from the reference alone
+        self.verses: Dict[str, Dict] = {}
+        ambiguous = set()
+        for verse in verses:
+            reference = verse["reference"]
+            known = self.verses.get(reference)
+            if known is not None and known != verse:
+                ambiguous.add(reference)
+            self.verses[reference] = dict(verse)
+        for reference in ambiguous:
+            del self.verses[reference]
+
+        # References already logged as missing, so a popular entry doesn't flood the log
+        self._missing_verses: Set[str] = set()
+
+    def compact(self, entry_type: EntryType, response: Dict) -> Dict:
+        """
+        Reduce a response to references into the content store
+
+        Args:
+            entry_type: Type of the entry the response belongs to
+            response: Full feeling or devotion response
+
+        Returns:
+            Compact response, or the response unchanged when it has a shape
+            the store doesn't know how to rebuild
+        """
+        if entry_type == EntryType.FEEL and set(response) == FEELING_FIELDS:
+            return self._compact_feeling(response)
+        if (
+            entry_type == EntryType.DEVOTION
+            and set(response) == DEVOTION_FIELDS
+            and set(response["plan"]) == DEVOTION_PLAN_FIELDS
+        ):
+            return self._compact_devotion(response)
+        return response
+
+    def expand(self, entry_type: EntryType, stored: Dict) -> Dict:
+        """
+        Rebuild the full response for a stored entry
+
+        Args:
+            entry_type: Type of the entry
+            stored: Stored response_json, compact or legacy
+
+        Returns:
+            Full feeling or devotion response
+        """
+        if not self.is_compact(stored):
+            return stored
+
+        if entry_type == EntryType.FEEL:
+            return self._expand_feeling(stored)
+        return self._expand_devotion(stored)
+
+    @staticmethod
+    def is_compact(stored: Any) -> bool:
+        """Check whether a stored response_json is in the compact format"""
+        return isinstance(stored, dict) and stored.get("v") == COMPACT_FORMAT_VERSION
+
+    def _compact_feeling(self, response: Dict) -> Dict:
+        topic = response["topic"]
+        template_key = topic if topic in self.feeling_templates else "comfort"
+        template = self.feeling_templates[template_key]
+
+        compact = {
+            "v": COMPACT_FORMAT_VERSION,
+            "template": template_key,
+            "topic": topic,
+            "verses": self._verse_refs(response["verses"]),
+        }
+        # Generated reflections are unique to the entry, so they're kept verbatim
+        for field in ("reflection", "prayer"):
+            if response[field] != template[field]:
+                compact[field] = response[field]
+        return compact
+
+    def _expand_feeling(self, stored: Dict) -> Dict:
+        template = self.feeling_templates.get(stored["template"], self.feeling_templates["comfort"])
+        return {
+            "verses": self._verses(stored["verses"]),
+            "reflection": stored.get("reflection", template["reflection"]),
+            "prayer": stored.get("prayer", template["prayer"]),
+            "topic": stored["topic"],
+        }
+
+    def _compact_devotion(self, response: Dict) -> Dict:
+        theme = response["theme"]
+        template_key = theme if theme in self.devotion_templates else "peace"
+        template = self.devotion_templates[template_key]
+        plan = response["plan"]
+
+        compact = {
+            "v": COMPACT_FORMAT_VERSION,
+            "template": template_key,
+            "theme": theme,
+            "verses": self._verse_refs(plan["scriptures"]),
+            "video": self._video_ref(response["video"]),
+        }
+        for field in DEVOTION_TEMPLATE_FIELDS:
+            if plan[field] != template[field]:
+                compact[field] = plan[field]
+        return compact
+
+    def _expand_devotion(self, stored: Dict) -> Dict:
+        template = self.devotion_templates.get(stored["template"], self.devotion_templates["peace"])
+        plan = {field: stored.get(field, template[field]) for field in DEVOTION_TEMPLATE_FIELDS}
+        return {
+            "plan": {
+                "opening_prayer": plan["opening_prayer"],
+                "scriptures": self._verses(stored["verses"]),
+                "reflection": plan["reflection"],
+                "action_steps": list(plan["action_steps"]),
+                "closing_prayer": plan["closing_prayer"],
+            },
+            "video": self._video(stored["video"]),
+            "theme": stored["theme"],
+        }
+
+    def _verse_refs(self, verses: List[Dict]) -> List[Union[str, Dict]]:
+        """Replace known verses with their reference; other providers' verses are kept inline"""
+        return [
+            verse["reference"] if self.verses.get(verse["reference"]) == verse else verse
+            for verse in verses
+        ]
+
+    def _verses(self, refs: List[Union[str, Dict]]) -> List[Dict]:
+        return [self._verse(ref) if isinstance(ref, str) else ref for ref in refs]
+
+    def _verse(self, ref: str) -> Dict:
+        """Look up a referenced verse, falling back to the bare reference if a content release removed it"""
+        verse = self.verses.get(ref)
+        if verse is not None:
+            return dict(verse)
+
+        if ref not in self._missing_verses:
+            self._missing_verses.add(ref)
+            logger.warning("Verse %s is referenced by stored entries but missing from the content store", ref)
+        return {"reference": ref, "text": "", "translation": ""}
+
+    def _video_ref(self, video: Optional[Dict]) -> Optional[Dict]:
+        """Reference a fallback video by theme, or keep a search result without derivable fields"""
+        if video is None:
+            return None
+
+        for key, fallback in self.fallback_videos.items():
+            if video == fallback:
+                return {"fallback": key}
+
+        ref = dict(video)
+        if ref.get("thumbnailUrl") == THUMBNAIL_URL.format(video_id=ref.get("videoId")):
+            del ref["thumbnailUrl"]
+        return ref
+
+    def _video(self, ref: Optional[Dict]) -> Optional[Dict]:
+        if ref is None:
+            return None
+        if "fallback" in ref:
+            return dict(self.fallback_videos.get(ref["fallback"], self.fallback_videos["peace"]))
+
+        video = dict(ref)
+        video.setdefault("thumbnailUrl", THUMBNAIL_URL.format(video_id=video["videoId"]))
+        return video
+
+
+_content_store: Optional[ContentStore] = None
+
+
+def get_content_store() -> ContentStore:
+    """Get the process-wide content store, indexing the content on first use"""
+    global _content_store
+
+    if _content_store is None:
+        verses = [verse for topic_verses in TOPIC_VERSES.values() for verse in topic_verses]
+        _content_store = ContentStore(
+            FEELING_TEMPLATES,
+            DEVOTION_TEMPLATES,
+            verses + COMMON_VERSES,
+            FALLBACK_VIDEOS,
+        )
+
+    return _content_store
+
+
+if __name__ == "__main__":
+    # Rewrite legacy full responses in place: python -m app.services.content.store
+    import asyncio
+    from sqlalchemy import select, update
+    from app.core.database import AsyncSessionLocal
+    from app.models.entry import Entry
+
+    async def _compact_legacy(batch_size: int = 500):
+        store = get_content_store()
+        compacted = 0
+        last_id = 0
+        async with AsyncSessionLocal() as db:
+            while True:
+                result = await db.execute(
+                    select(Entry.id, Entry.type, Entry.response_json)
+                    .where(Entry.id > last_id)
+                    .order_by(Entry.id)
+                    .limit(batch_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+
+                for entry_id, entry_type, response_json in rows:
+                    if store.is_compact(response_json):
+                        continue
+                    compact = store.compact(entry_type, response_json)
+                    if compact is not response_json:
+                        await db.execute(
+                            update(Entry).where(Entry.id == entry_id).values(response_json=compact)
+                        )
+                        compacted += 1
+
+                await db.commit()
+                last_id = rows[-1][0]
+
+        print(f"Compacted {compacted} entries")
+
+    asyncio.run(_compact_legacy())
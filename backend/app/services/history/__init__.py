@@ -0,0 +1,35 @@
+from .entries import save_entries
+from .counters import increment_counters, get_counts, reconcile_counters
+from .bookmarks import create_bookmark, find_bookmark, delete_bookmark, create_bookmarks, delete_bookmarks
+from .changes import get_changes, get_head
+from .search import search_entries, MAX_SEARCH_RESULTS
+from .trends import get_trend, rebuild_topic_days, MAX_TREND_DAYS
+from .retention import maintain_partitions, drop_expired_partitions, run_partition_maintenance_forever
+from .writer import EntryWriter, persist_entries, start_entry_writer, get_entry_writer, close_entry_writer
+
+__all__ = [
+    "save_entries",
+    "increment_counters",
+    "get_counts",
+    "reconcile_counters",
+    "create_bookmark",
+    "find_bookmark",
+    "delete_bookmark",
+    "create_bookmarks",
+    "delete_bookmarks",
+    "get_changes",
+    "get_head",
+    "search_entries",
+    "MAX_SEARCH_RESULTS",
+    "get_trend",
+    "rebuild_topic_days",
+    "MAX_TREND_DAYS",
+    "maintain_partitions",
+    "drop_expired_partitions",
+    "run_partition_maintenance_forever",
+    "EntryWriter",
+    "persist_entries",
+    "start_entry_writer",
+    "get_entry_writer",
+    "close_entry_writer",
+]
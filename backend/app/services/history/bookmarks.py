@@ -0,0 +1,244 @@
+from typing import Dict, List, Optional
+from sqlalchemy import Integer, String, select, delete, update, func, literal, exists, and_
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import mark_recent_write
+from app.models.bookmark import Bookmark
+from app.models.counter import UserCounter
+from app.models.entry import Entry
+from app.services.history.changes import BOOKMARK_CHANGE, CREATE, DELETE, log_changes
+from app.services.history.counters import BOOKMARK
+
+# Per-item result codes for bulk bookmark operations
+CREATED = "created"
+EXISTS = "exists"
+DELETED = "deleted"
+NOT_FOUND = "not_found"
+
+
+async def create_bookmark(db: AsyncSession, user_id: int, entry_id: int) -> Optional[int]:
+    """
+    Bookmark an entry with a single statement
+
+    The insert selects from entries so a missing entry inserts nothing,
+    ON CONFLICT skips existing bookmarks, and a chained CTE bumps the
+    user's bookmark counter only when a row was actually inserted. Another
+    CTE logs the change for delta sync.
+
+    Returns:
+        New bookmark id, or None if the entry is missing or already bookmarked
+    """
+    inserted = (
+        pg_insert(Bookmark)
+        .from_select(
+            ["user_id", "entry_id"],
+            select(literal(user_id, Integer), Entry.id).where(Entry.id == entry_id),
+        )
+        .on_conflict_do_nothing(index_elements=[Bookmark.user_id, Bookmark.entry_id])
+        .returning(Bookmark.id, Bookmark.user_id, Bookmark.entry_id)
+        .cte("inserted")
+    )
+
+    counter = pg_insert(UserCounter).from_select(
+        ["user_id", "kind", "count"],
+        select(literal(user_id, Integer), literal(BOOKMARK, String), func.count())
+        .select_from(inserted)
+        .having(func.count() > 0),
+    )
+    counter = counter.on_conflict_do_update(
+        index_elements=[UserCounter.user_id, UserCounter.kind],
+        set_={"count": UserCounter.count + counter.excluded.count},
+    ).cte("counted")
+
+    logged = log_changes(
+        inserted, BOOKMARK_CHANGE, CREATE, inserted.c.id, inserted.c.user_id, inserted.c.entry_id
+    ).cte("logged")
+
+    result = await db.execute(select(inserted.c.id).add_cte(counter).add_cte(logged))
+    bookmark_id = result.scalar_one_or_none()
+    await db.commit()
+    if bookmark_id is not None:
+        await mark_recent_write([user_id])
+    return bookmark_id
+
+
+async def find_bookmark(db: AsyncSession, user_id: int, entry_id: int) -> Optional[int]:
+    """Get the id of a user's existing bookmark on an entry"""
+    result = await db.execute(
+        select(Bookmark.id).where(Bookmark.user_id == user_id, Bookmark.entry_id == entry_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def delete_bookmark(db: AsyncSession, user_id: int, bookmark_id: int) -> bool:
+    """
+    Remove a user's bookmark with a single DELETE ... RETURNING, decrementing the counter in the same statement
+
+    Returns:
+        True if a bookmark was removed
+    """
+    deleted = (
+        delete(Bookmark)
+        .where(Bookmark.id == bookmark_id, Bookmark.user_id == user_id)
+        .returning(Bookmark.id, Bookmark.user_id, Bookmark.entry_id)
+        .cte("deleted")
+    )
+
+    counter = (
+        update(UserCounter)
+        .where(UserCounter.user_id == user_id, UserCounter.kind == BOOKMARK)
+        .values(count=UserCounter.count - select(func.count()).select_from(deleted).scalar_subquery())
+        .cte("counted")
+    )
+
+    # Tombstone for delta sync clients
+    logged = log_changes(
+        deleted, BOOKMARK_CHANGE, DELETE, deleted.c.id, deleted.c.user_id, deleted.c.entry_id
+    ).cte("logged")
+
+    result = await db.execute(select(deleted.c.id).add_cte(counter).add_cte(logged))
+    removed = result.scalar_one_or_none() is not None
+    await db.commit()
+    if removed:
+        await mark_recent_write([user_id])
+    return removed
+
+
+async def create_bookmarks(db: AsyncSession, user_id: int, entry_ids: List[int]) -> List[Dict]:
+    """
+    Bookmark many entries with a single statement
+
+    Works like create_bookmark over the whole list: one INSERT ... SELECT
+    skips missing entries and existing bookmarks, and chained CTEs bump the
+    counter by the number of inserted rows and log each new bookmark. The
+    outer select reads the snapshot from before the insert, so it reports
+    which bookmarks already existed and which entries are missing.
+
+    Args:
+        db: Database session
+        user_id: User adding the bookmarks
+        entry_ids: Entries to bookmark; duplicates are ignored
+
+    Returns:
+        One result per distinct entry id in request order, with entry_id,
+        status (created, exists or not_found) and bookmark_id
+    """
+    entry_ids = list(dict.fromkeys(entry_ids))
+    if not entry_ids:
+        return []
+    ids = literal(entry_ids, ARRAY(Integer))
+
+    requested = select(func.unnest(ids).label("entry_id")).cte("requested")
+
+    inserted = (
+        pg_insert(Bookmark)
+        .from_select(
+            ["user_id", "entry_id"],
+            # Ordered so concurrent batches take bookmark index locks in the same order
+            select(literal(user_id, Integer), Entry.id).where(Entry.id == func.any(ids)).order_by(Entry.id),
+        )
+        .on_conflict_do_nothing(index_elements=[Bookmark.user_id, Bookmark.entry_id])
+        .returning(Bookmark.id, Bookmark.user_id, Bookmark.entry_id)
+        .cte("inserted")
+    )
+
+    counter = pg_insert(UserCounter).from_select(
+        ["user_id", "kind", "count"],
+        select(literal(user_id, Integer), literal(BOOKMARK, String), func.count())
+        .select_from(inserted)
+        .having(func.count() > 0),
+    )
+    counter = counter.on_conflict_do_update(
+        index_elements=[UserCounter.user_id, UserCounter.kind],
+        set_={"count": UserCounter.count + counter.excluded.count},
+    ).cte("counted")
+
+    logged = log_changes(
+        inserted, BOOKMARK_CHANGE, CREATE, inserted.c.id, inserted.c.user_id, inserted.c.entry_id
+    ).cte("logged")
+
+    statement = (
+        select(
+            requested.c.entry_id,
+            inserted.c.id.label("created_id"),
+            Bookmark.id.label("existing_id"),
+            exists().where(Entry.id == requested.c.entry_id).label("found"),
+        )
+        .select_from(requested)
+        .outerjoin(inserted, inserted.c.entry_id == requested.c.entry_id)
+        .outerjoin(Bookmark, and_(Bookmark.user_id == user_id, Bookmark.entry_id == requested.c.entry_id))
+        .add_cte(counter)
+        .add_cte(logged)
+    )
+    rows = {row.entry_id: row for row in (await db.execute(statement)).all()}
+    await db.commit()
+
+    results = []
+    for entry_id in entry_ids:
+        row = rows[entry_id]
+        if row.created_id is not None:
+            status, bookmark_id = CREATED, row.created_id
+        elif row.found:
+            # Already bookmarked; the id is None only if a concurrent request created it
+            status, bookmark_id = EXISTS, row.existing_id
+        else:
+            status, bookmark_id = NOT_FOUND, None
+        results.append({"entry_id": entry_id, "status": status, "bookmark_id": bookmark_id})
+
+    if any(result["status"] == CREATED for result in results):
+        await mark_recent_write([user_id])
+    return results
+
+
+async def delete_bookmarks(db: AsyncSession, user_id: int, entry_ids: List[int]) -> List[Dict]:
+    """
+    Remove a user's bookmarks on many entries with a single DELETE ... RETURNING
+
+    The counter decrement and the delta sync tombstones run as CTEs of the
+    same statement, as in delete_bookmark.
+
+    Args:
+        db: Database session
+        user_id: User removing the bookmarks
+        entry_ids: Bookmarked entries; duplicates are ignored
+
+    Returns:
+        One result per distinct entry id in request order, with entry_id,
+        status (deleted or not_found) and bookmark_id
+    """
+    entry_ids = list(dict.fromkeys(entry_ids))
+    if not entry_ids:
+        return []
+
+    deleted = (
+        delete(Bookmark)
+        .where(Bookmark.user_id == user_id, Bookmark.entry_id == func.any(literal(entry_ids, ARRAY(Integer))))
+        .returning(Bookmark.id, Bookmark.user_id, Bookmark.entry_id)
+        .cte("deleted")
+    )
+
+    counter = (
+        update(UserCounter)
+        .where(UserCounter.user_id == user_id, UserCounter.kind == BOOKMARK)
+        .values(count=UserCounter.count - select(func.count()).select_from(deleted).scalar_subquery())
+        .cte("counted")
+    )
+
+    logged = log_changes(
+        deleted, BOOKMARK_CHANGE, DELETE, deleted.c.id, deleted.c.user_id, deleted.c.entry_id
+    ).cte("logged")
+
+    result = await db.execute(select(deleted.c.entry_id, deleted.c.id).add_cte(counter).add_cte(logged))
+    removed = dict(result.all())
+    await db.commit()
+    if removed:
+        await mark_recent_write([user_id])
+
+    return [
+        {
+            "entry_id": entry_id,
+            "status": DELETED if entry_id in removed else NOT_FOUND,
+            "bookmark_id": removed.get(entry_id),
+        }
+        for entry_id in entry_ids
+    ]
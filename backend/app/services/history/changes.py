@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import BigInteger, String, and_, literal, literal_column, null, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.change import HistoryChange
+from app.models.entry import Entry
+from app.services.content import get_content_store
+from app.services.history.fields import ENTRY_LIST_FIELDS, entry_columns, serialize_entry
+
+ENTRY = "entry"
+BOOKMARK_CHANGE = "bookmark"
+CREATE = "create"
+DELETE = "delete"
+
+# Oldest transaction still running: every change with a lower xid is committed or rolled back
+VISIBLE_XID_LIMIT = literal_column("(pg_snapshot_xmin(pg_current_snapshot())::text)::bigint", BigInteger)
+
+
+def log_changes(source: Any, kind: str, op: str, object_id: Any, user_id: Any, entry_id: Any = None):
+    """
+    Build an INSERT ... SELECT logging one change per row of a RETURNING CTE
+
+    Args:
+        source: CTE of inserted or deleted rows
+        kind: entry or bookmark
+        op: create or delete
+        object_id: Column of source holding the changed row's id
+        user_id: Column of source holding the owner; rows without one are skipped
+        entry_id: Optional column of source holding the bookmarked entry id
+
+    Returns:
+        Insert statement, for use as a CTE in the same statement
+    """
+    return pg_insert(HistoryChange).from_select(
+        ["user_id", "kind", "op", "object_id", "entry_id"],
+        select(
+            user_id,
+            literal(kind, String),
+            literal(op, String),
+            object_id,
+            entry_id if entry_id is not None else null(),
+        ).select_from(source).where(user_id.isnot(None)),
+    )
+
+
+async def get_changes(
+    db: AsyncSession,
+    user_id: int,
+    after: Optional[Tuple[int, int]] = None,
+    limit: int = 500,
+) -> Tuple[List[Dict], Optional[Tuple[int, int]], bool]:
+    """
+    Read a user's history changes after a change log position
+
+    Only changes from transactions older than the oldest one still running
+    are returned, so a transaction that commits late can never be skipped
+    by a client that has already moved past its position.
+
+    Args:
+        db: Database session on the primary
+        user_id: User whose changes to read
+        after: Optional (xid, change id) position to resume from
+        limit: Maximum number of changes to return
+
+    Returns:
+        Tuple of (changes, position of the last change or None, whether more changes are ready)
+    """
+    query = (
+        select(
+            HistoryChange.id.label("change_id"),
+            HistoryChange.xid,
+            HistoryChange.kind,
+            HistoryChange.op,
+            HistoryChange.object_id,
+            HistoryChange.entry_id.label("bookmarked_entry_id"),
+            HistoryChange.created_at.label("changed_at"),
+            *entry_columns(list(ENTRY_LIST_FIELDS), prefix="entry_"),
+        )
+        .outerjoin(
+            Entry,
+            and_(
+                HistoryChange.kind == ENTRY,
+                HistoryChange.op == CREATE,
+                Entry.id == HistoryChange.object_id,
+            ),
+        )
+        .where(HistoryChange.user_id == user_id, HistoryChange.xid < VISIBLE_XID_LIMIT)
+    )
+    if after is not None:
+        query = query.where(tuple_(HistoryChange.xid, HistoryChange.id) > tuple_(*after))
+
+    query = query.order_by(HistoryChange.xid, HistoryChange.id).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    position = (rows[-1].xid, rows[-1].change_id) if rows else after
+
+    store = get_content_store()
+    changes = []
+    for row in rows:
+        change = {"kind": row.kind, "op": row.op, "id": row.object_id, "changed_at": row.changed_at}
+        if row.kind == ENTRY and row.op == CREATE:
+            # Entries that have since expired come back as None, followed by their delete
+            change["entry"] = (
+                serialize_entry(row, list(ENTRY_LIST_FIELDS), store, prefix="entry_")
+                if row._mapping["entry_id"] is not None else None
+            )
+        elif row.kind == BOOKMARK_CHANGE:
+            change["entry_id"] = row.bookmarked_entry_id
+        changes.append(change)
+
+    return changes, position, has_more
+
+
+async def get_head(db: AsyncSession) -> Tuple[int, int]:
+    """Change log position just past every change that is already visible"""
+    xid = (await db.execute(select(VISIBLE_XID_LIMIT))).scalar_one()
+    return xid, 0
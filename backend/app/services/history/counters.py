@@ -0,0 +1,99 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import String, select, delete, func, cast, union_all, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.bookmark import Bookmark
+from app.models.counter import UserCounter
+from app.models.entry import Entry
+
+BOOKMARK = "bookmark"
+
+
+async def increment_counters(db: AsyncSession, deltas: Dict[Tuple[int, str], int]) -> None:
+    """
+    Apply counter deltas inside the caller's transaction
+
+    Args:
+        db: Database session; the caller commits
+        deltas: Mapping of (user_id, kind) to the amount to add (may be negative)
+    """
+    rows = [
+        {"user_id": user_id, "kind": kind, "count": delta}
+        # Sorted so concurrent transactions lock counter rows in the same order
+        for (user_id, kind), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+
+    statement = pg_insert(UserCounter).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserCounter.user_id, UserCounter.kind],
+        set_={"count": UserCounter.count + statement.excluded.count},
+    )
+    await db.execute(statement)
+
+
+def entry_deltas(entries: Iterable[Dict]) -> Dict[Tuple[int, str], int]:
+    """Count new entries per (user_id, kind)"""
+    return dict(Counter(
+        (entry["user_id"], entry_kind(entry["type"]))
+        for entry in entries
+        if entry.get("user_id")
+    ))
+
+
+async def get_counts(db: AsyncSession, user_id: int) -> Dict[str, int]:
+    """Get a user's counters keyed by kind"""
+    result = await db.execute(
+        select(UserCounter.kind, UserCounter.count).where(UserCounter.user_id == user_id)
+    )
+    return {kind: count for kind, count in result.all()}
+
+
+async def reconcile_counters(db: AsyncSession, user_id: Optional[int] = None) -> None:
+    """
+    Rebuild counters from the entries and bookmarks tables
+
+    Args:
+        db: Database session
+        user_id: Optional user to reconcile; all users when omitted
+    """
+    entry_counts = select(Entry.user_id, func.lower(cast(Entry.type, String)), func.count()).where(
+        Entry.user_id.isnot(None)
+    ).group_by(Entry.user_id, Entry.type)
+    bookmark_counts = select(Bookmark.user_id, literal(BOOKMARK), func.count()).group_by(Bookmark.user_id)
+
+    clear = delete(UserCounter)
+    if user_id is not None:
+        entry_counts = entry_counts.where(Entry.user_id == user_id)
+        bookmark_counts = bookmark_counts.where(Bookmark.user_id == user_id)
+        clear = clear.where(UserCounter.user_id == user_id)
+
+    await db.execute(clear)
+    await db.execute(
+        pg_insert(UserCounter).from_select(
+            ["user_id", "kind", "count"],
+            union_all(entry_counts, bookmark_counts),
+        )
+    )
+    await db.commit()
+
+
+def entry_kind(entry_type) -> str:
+    """Counter kind for an entry type"""
+    return entry_type.value if hasattr(entry_type, "value") else str(entry_type)
+
+
+if __name__ == "__main__":
+    # Repair drift after manual data fixes: python -m app.services.history.counters
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+
+    async def _reconcile():
+        async with AsyncSessionLocal() as db:
+            await reconcile_counters(db)
+        print("Reconciled user counters")
+
+    asyncio.run(_reconcile())
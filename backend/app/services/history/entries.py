@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import mark_recent_write
+from app.models.entry import Entry
+from app.services.content import get_content_store
+from app.services.history.changes import ENTRY, CREATE, log_changes
+from app.services.history.counters import increment_counters, entry_deltas
+from app.services.history.trends import increment_topic_days, topic_day_deltas
+
+
+async def save_entries(db: AsyncSession, entries: List[Dict]) -> None:
+    """
+    Persist entries with a single multi-row INSERT and update the
+    per-user counters, daily topic rollups and change log in the same
+    transaction
+
+    Responses are stored as compact references into the content store;
+    read them back with ContentStore.expand.
+
+    Entries keep the created_at they were made at, so entries written late
+    (queued or replayed) land at their original place in history, in their
+    month's partition and on their day's rollup; entries without one are
+    stamped now.
+
+    Args:
+        db: Database session
+        entries: Entry column values (user_id, type, topic, input_text, response_json, optional created_at)
+    """
+    if not entries:
+        return
+
+    store = get_content_store()
+    now = datetime.now(timezone.utc)
+    entries = [{**entry, "created_at": entry.get("created_at") or now} for entry in entries]
+    rows = [
+        {**entry, "response_json": store.compact(entry["type"], entry["response_json"])}
+        for entry in entries
+    ]
+
+    # Log the new entries for delta sync in the same statement
+    inserted = insert(Entry).values(rows).returning(Entry.id, Entry.user_id).cte("inserted")
+    logged = log_changes(inserted, ENTRY, CREATE, inserted.c.id, inserted.c.user_id).cte("logged")
+    await db.execute(select(func.count()).select_from(inserted).add_cte(logged))
+    await increment_counters(db, entry_deltas(entries))
+    await increment_topic_days(db, topic_day_deltas(entries))
+    await db.commit()
+    await mark_recent_write(entry["user_id"] for entry in entries)
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import logging
+from typing import AsyncIterator, Callable, Dict, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.models.bookmark import Bookmark
+from app.models.entry import Entry
+from app.services.content import get_content_store
+
+logger = logging.getLogger("abide")
+
+EXPORT_FORMATS = ("ndjson", "csv")
+CSV_COLUMNS = ["record", "id", "type", "topic", "input_text", "response", "entry_id", "created_at", "count"]
+
+
+async def export_records(
+    user_id: int,
+    chunk_size: int = 500,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> AsyncIterator[List[Dict]]:
+    """
+    Stream a user's entries and then bookmarks, oldest first, then an end marker
+
+    Rows are read through a server-side cursor, chunk_size at a time, so
+    memory use doesn't grow with the size of the history. A complete
+    export ends with `{"record": "end", "count": <records before it>}`.
+    If reading fails partway, the error is raised after the response has
+    started, which aborts the connection instead of ending the body
+    cleanly, and no end marker is sent; clients should treat an export
+    without one as incomplete.
+
+    Args:
+        user_id: User to export
+        chunk_size: Rows fetched from the cursor per round trip
+        session_factory: Session factory; the export holds its own session
+            for as long as the response streams
+
+    Yields:
+        Lists of export records, one list per fetched chunk
+    """
+    store = get_content_store()
+    entries = select(
+        Entry.id, Entry.type, Entry.topic, Entry.input_text, Entry.response_json, Entry.created_at
+    ).where(Entry.user_id == user_id).order_by(Entry.created_at, Entry.id)
+    bookmarks = select(
+        Bookmark.id, Bookmark.entry_id, Bookmark.created_at
+    ).where(Bookmark.user_id == user_id).order_by(Bookmark.created_at, Bookmark.id)
+
+    count = 0
+    try:
+        async with session_factory() as db:
+            result = await db.stream(entries.execution_options(yield_per=chunk_size))
+            async for rows in result.partitions():
+                chunk = [
+                    {
+                        "record": "entry",
+                        "id": entry_id,
+                        "type": entry_type.value,
+                        "topic": topic,
+                        "input_text": input_text,
+                        "response": store.expand(entry_type, response_json),
+                        "created_at": created_at.isoformat() if created_at else None,
+                    }
+                    for entry_id, entry_type, topic, input_text, response_json, created_at in rows
+                ]
+                count += len(chunk)
+                yield chunk
+
+            result = await db.stream(bookmarks.execution_options(yield_per=chunk_size))
+            async for rows in result.partitions():
+                chunk = [
+                    {
+                        "record": "bookmark",
+                        "id": bookmark_id,
+                        "entry_id": entry_id,
+                        "created_at": created_at.isoformat() if created_at else None,
+                    }
+                    for bookmark_id, entry_id, created_at in rows
+                ]
+                count += len(chunk)
+                yield chunk
+    except Exception as e:
+        logger.error("History export for user %s failed after %d records: %r", user_id, count, e)
+        raise
+
+    yield [{"record": "end", "count": count}]
+
+
+async def export_ndjson(records: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """Encode export chunks as newline-delimited JSON"""
+    async for chunk in records:
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk).encode("utf-8")
+
+
+async def export_csv(records: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """Encode export chunks as CSV with a header row; responses are JSON-encoded cells"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+
+    async for chunk in records:
+        for record in chunk:
+            if "response" in record:
+                record = {**record, "response": json.dumps(record["response"], ensure_ascii=False)}
+            writer.writerow(record)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header only, for users without history
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
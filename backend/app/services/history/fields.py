@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.entry import Entry
+from app.services.content import ContentStore
+
+# Public field name -> entry column, in response order
+ENTRY_FIELDS = {
+    "id": Entry.id,
+    "type": Entry.type,
+    "topic": Entry.topic,
+    "input_text": Entry.input_text,
+    "response": Entry.response_json,
+    "created_at": Entry.created_at,
+}
+ENTRY_LIST_FIELDS = tuple(ENTRY_FIELDS)
+BOOKMARK_ENTRY_FIELDS = ("id", "type", "topic", "response", "created_at")
+
+
+def parse_fields(fields: Optional[str], default: Tuple[str, ...]) -> List[str]:
+    """
+    Parse a comma-separated `fields=` parameter
+
+    Args:
+        fields: Requested field names, or None for the default set
+        default: Fields returned when none are requested
+
+    Returns:
+        Requested field names in response order
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    if not fields:
+        return list(default)
+
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - ENTRY_FIELDS.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    return [name for name in ENTRY_FIELDS if name in requested]
+
+
+def entry_columns(names: List[str], prefix: str = "") -> List[Any]:
+    """
+    Columns to select for the requested fields
+
+    id and created_at are always selected for ordering and cursors, and type
+    whenever the response is requested, since expanding it depends on type.
+    """
+    needed = set(names) | {"id", "created_at"}
+    if "response" in needed:
+        needed.add("type")
+    return [column.label(prefix + name) for name, column in ENTRY_FIELDS.items() if name in needed]
+
+
+def serialize_entry(row: Any, names: List[str], store: ContentStore, prefix: str = "") -> Dict:
+    """Build an entry payload with only the requested fields from a projected row"""
+    mapping = row._mapping
+    payload = {}
+    for name in names:
+        value = mapping[prefix + name]
+        if name == "response":
+            value = store.expand(mapping[prefix + "type"], value)
+        payload[name] = value
+    return payload
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, timezone
+from typing import List, Optional
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import Base, async_engine
+from app.core.partitions import (
+    ENTRIES_TABLE,
+    MAINTENANCE_LOCK_KEY,
+    add_months,
+    ensure_entry_partitions,
+    is_partitioned,
+    list_entry_partitions,
+    month_start,
+)
+from app.services.history.counters import BOOKMARK, increment_counters
+
+logger = logging.getLogger("abide")
+
+
+async def drop_expired_partitions(retention_months: int, today: Optional[date] = None) -> List[str]:
+    """
+    Drop whole entries partitions that are older than the retention period
+
+    Each partition is dropped in its own transaction, together with the
+    bookmarks that point into it, the matching counter decrements and the
+    month's topic rollups. Deleted entries and bookmarks are logged as
+    tombstones for delta sync.
+
+    Args:
+        retention_months: Full months to keep before the current one; 0 keeps everything
+        today: Optional reference date, defaults to today in UTC
+
+    Returns:
+        Names of the partitions that were dropped
+    """
+    if retention_months <= 0:
+        return []
+
+    cutoff = add_months(month_start(today), -retention_months)
+    async with async_engine.connect() as conn:
+        expired = [(name, month) for name, month in await list_entry_partitions(conn) if month < cutoff]
+
+    dropped = []
+    for name, month in expired:
+        async with async_engine.begin() as conn:
+            # Block new bookmarks on these entries until the partition is gone
+            await conn.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+
+            deltas = Counter()
+            result = await conn.execute(text(
+                f"SELECT user_id, lower(type::text), count(*) FROM {name} "
+                f"WHERE user_id IS NOT NULL GROUP BY 1, 2"
+            ))
+            for user_id, kind, count in result.all():
+                deltas[(user_id, kind)] -= count
+
+            # Remove bookmarks on the expiring entries, leaving tombstones for delta sync
+            result = await conn.execute(text(
+                f"WITH removed AS ("
+                f"DELETE FROM bookmarks b USING {name} e WHERE b.entry_id = e.id "
+                f"RETURNING b.id, b.user_id, b.entry_id), "
+                f"logged AS (INSERT INTO history_changes (user_id, kind, op, object_id, entry_id) "
+                f"SELECT user_id, 'bookmark', 'delete', id, entry_id FROM removed) "
+                f"SELECT user_id FROM removed"
+            ))
+            for (user_id,) in result.all():
+                deltas[(user_id, BOOKMARK)] -= 1
+
+            await conn.execute(text(
+                f"INSERT INTO history_changes (user_id, kind, op, object_id) "
+                f"SELECT user_id, 'entry', 'delete', id FROM {name} WHERE user_id IS NOT NULL"
+            ))
+
+            await increment_counters(conn, dict(deltas))
+            await conn.execute(
+                text("DELETE FROM user_topic_days WHERE day >= :start AND day < :end"),
+                {"start": month, "end": add_months(month, 1)},
+            )
+            await conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    return dropped
+
+
+async def maintain_partitions() -> bool:
+    """
+    Create upcoming partitions and apply the retention policies
+
+    Every worker runs maintenance on a timer; a session advisory lock lets
+    one run at a time, and the others skip their turn.
+
+    Returns:
+        False if another run held the lock
+    """
+    async with async_engine.connect() as lock_conn:
+        result = await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+        acquired = bool(result.scalar())
+        # The session lock outlives the transaction, so don't sit idle in one while maintenance runs
+        await lock_conn.commit()
+        if not acquired:
+            return False
+
+        try:
+            await _maintain_partitions()
+        finally:
+            try:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+                await lock_conn.commit()
+            except Exception:
+                # Closing the session is the only other way to release its lock
+                await lock_conn.invalidate()
+                raise
+    return True
+
+
+async def _maintain_partitions() -> None:
+    async with async_engine.begin() as conn:
+        created = await ensure_entry_partitions(conn, settings.ENTRY_PARTITION_MONTHS_AHEAD)
+    if created:
+        logger.info("Created entries partitions: %s", ", ".join(created))
+
+    dropped = await drop_expired_partitions(settings.ENTRY_RETENTION_MONTHS)
+    if dropped:
+        logger.info("Dropped expired entries partitions: %s", ", ".join(dropped))
+
+    if settings.HISTORY_CHANGES_RETENTION_DAYS > 0:
+        async with async_engine.begin() as conn:
+            await conn.execute(
+                text("DELETE FROM history_changes WHERE created_at < now() - make_interval(days => :days)"),
+                {"days": settings.HISTORY_CHANGES_RETENTION_DAYS},
+            )
+
+
+async def run_partition_maintenance_forever(interval: int) -> None:
+    """Keep partitions ahead of the calendar and behind the retention cutoff"""
+    while True:
+        try:
+            await maintain_partitions()
+        except Exception as e:
+            logger.warning("Partition maintenance failed: %r", e)
+
+        await asyncio.sleep(interval)
+
+
+async def migrate_entries_to_partitioned() -> bool:
+    """
+    Convert an entries table created before partitioning into the partitioned layout
+
+    Copies every row into monthly partitions covering the existing data,
+    keeps entry ids (and so bookmarks) intact, and drops the bookmarks
+    foreign key, which can't reference a table whose partitions get dropped.
+
+    Returns:
+        False if the table was already partitioned
+    """
+    async with async_engine.begin() as conn:
+        if await is_partitioned(conn):
+            return False
+
+        await conn.execute(text("ALTER TABLE bookmarks DROP CONSTRAINT IF EXISTS bookmarks_entry_id_fkey"))
+        await conn.execute(text(f"ALTER TABLE {ENTRIES_TABLE} RENAME TO entries_legacy"))
+        await conn.execute(text(f"ALTER SEQUENCE IF EXISTS {ENTRIES_TABLE}_id_seq RENAME TO entries_legacy_id_seq"))
+
+        # Free the index names for the partitioned table
+        result = await conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'entries_legacy'"))
+        for (index_name,) in result.all():
+            await conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+
+        await conn.run_sync(lambda sync_conn: Base.metadata.tables[ENTRIES_TABLE].create(sync_conn, checkfirst=True))
+
+        oldest = (await conn.execute(text("SELECT min(created_at) FROM entries_legacy"))).scalar()
+        start = oldest.astimezone(timezone.utc).date() if oldest is not None else None
+        await ensure_entry_partitions(conn, settings.ENTRY_PARTITION_MONTHS_AHEAD, start=start)
+
+        await conn.execute(text(
+            f"INSERT INTO {ENTRIES_TABLE} (id, user_id, type, topic, input_text, response_json, created_at) "
+            f"SELECT id, user_id, type, topic, input_text, response_json, coalesce(created_at, now()) "
+            f"FROM entries_legacy"
+        ))
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{ENTRIES_TABLE}', 'id'), "
+            f"coalesce((SELECT max(id) FROM {ENTRIES_TABLE}), 0) + 1, false)"
+        ))
+        await conn.execute(text("DROP TABLE entries_legacy"))
+
+    return True
+
+
+if __name__ == "__main__":
+    # Cron or one-off use: python -m app.services.history.retention [maintain|migrate]
+    import sys
+
+    async def _main(command: str):
+        if command == "migrate":
+            migrated = await migrate_entries_to_partitioned()
+            print("Migrated entries to monthly partitions" if migrated else "Entries already partitioned")
+        elif await maintain_partitions():
+            print("Partition maintenance complete")
+        else:
+            print("Partition maintenance is already running elsewhere")
+
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "maintain"))
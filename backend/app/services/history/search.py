@@ -0,0 +1,169 @@
+from typing import Dict, List, Optional
+from sqlalchemy import cast, func, literal, select, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.models.entry import Entry, EntryType, SEARCH_CONFIG, SEARCH_VECTOR_EXPRESSION, search_vector_expression
+from app.services.content import get_content_store
+from app.services.history.fields import entry_columns, serialize_entry
+
+MAX_SEARCH_RESULTS = 100
+SEARCH_INDEX = "ix_entries_search_vector"
+
+
+async def search_entries(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    names: List[str],
+    limit: int = 20,
+    entry_type: Optional[EntryType] = None,
+) -> List[Dict]:
+    """
+    Full-text search over one user's entries, best matches first
+
+    Args:
+        db: Database session
+        user_id: User whose entries to search; results never include other users' entries
+        query: Search text in web search syntax ("quoted phrases", -excluded, or)
+        names: Entry fields to return
+        limit: Maximum number of results
+        entry_type: Optional entry type filter
+
+    Returns:
+        Entry payloads with a relevance `rank`
+    """
+    ts_query = func.websearch_to_tsquery(cast(literal(SEARCH_CONFIG), REGCONFIG), query)
+    rank = func.ts_rank_cd(Entry.search_vector, ts_query).label("rank")
+
+    statement = select(*entry_columns(names), rank).where(
+        Entry.user_id == user_id,
+        Entry.search_vector.op("@@")(ts_query),
+    )
+    if entry_type:
+        statement = statement.where(Entry.type == entry_type)
+    statement = statement.order_by(rank.desc(), Entry.created_at.desc(), Entry.id.desc()).limit(limit)
+
+    result = await db.execute(statement)
+    store = get_content_store()
+    return [
+        {**serialize_entry(row, names, store), "rank": round(row.rank, 4)}
+        for row in result.all()
+    ]
+
+
+async def _entry_tables(conn: AsyncConnection) -> List[str]:
+    """Partitions of entries, including the default one, or just entries if it isn't partitioned"""
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'entries' ORDER BY c.relname"
+    ))
+    return [name for (name,) in result.all()] or ["entries"]
+
+
+async def _build_index_concurrently(conn: AsyncConnection, table: str, index: str) -> None:
+    """Build a GIN index on a table's search column without blocking writes, replacing a failed earlier build"""
+    valid = (await conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :index"
+    ), {"index": index})).scalar()
+    if valid:
+        return
+    if valid is not None:
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY {index}"))
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY {index} ON {table} USING gin (search_vector)"))
+
+
+async def add_search_column(batch_size: int = 5000) -> int:
+    """
+    Add the search column and index to an entries table created before search, online
+
+    A generated column would rewrite every partition under ACCESS EXCLUSIVE,
+    and a plain CREATE INDEX blocks writes while it builds, so instead:
+
+    1. Add a nullable search_vector column (a catalog-only change) and a
+       trigger that fills it on insert and update, under a short lock_timeout
+    2. Backfill existing rows in batches by id, one short transaction each
+    3. Build the GIN index on each partition with CREATE INDEX CONCURRENTLY
+       and attach it to an index created ON ONLY the parent
+
+    The column then holds the same document as the generated column of a
+    fresh install. Safe to rerun; finished steps are skipped. Needs
+    Postgres 13+ for row triggers on a partitioned table.
+
+    Returns:
+        Number of entries backfilled
+    """
+    from app.core.database import async_engine
+
+    async with async_engine.begin() as conn:
+        generated = (await conn.execute(text(
+            "SELECT is_generated FROM information_schema.columns "
+            "WHERE table_name = 'entries' AND column_name = 'search_vector'"
+        ))).scalar()
+        if generated != "ALWAYS":
+            # Fail fast rather than queue behind a long transaction and block every write behind us
+            await conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            await conn.execute(text("ALTER TABLE entries ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+            await conn.execute(text(
+                "CREATE OR REPLACE FUNCTION entries_search_vector() RETURNS trigger AS $$ BEGIN "
+                f"NEW.search_vector := {search_vector_expression('NEW.')}; RETURN NEW; "
+                "END $$ LANGUAGE plpgsql"
+            ))
+            await conn.execute(text("DROP TRIGGER IF EXISTS entries_search_vector ON entries"))
+            await conn.execute(text(
+                "CREATE TRIGGER entries_search_vector BEFORE INSERT OR UPDATE OF topic, input_text "
+                "ON entries FOR EACH ROW EXECUTE FUNCTION entries_search_vector()"
+            ))
+
+    backfilled = 0
+    if generated != "ALWAYS":
+        last_id = 0
+        while True:
+            async with async_engine.begin() as conn:
+                upto = (await conn.execute(text(
+                    "SELECT max(id) FROM (SELECT id FROM entries WHERE id > :last ORDER BY id LIMIT :n) AS batch"
+                ), {"last": last_id, "n": batch_size})).scalar()
+                if upto is None:
+                    break
+                result = await conn.execute(text(
+                    f"UPDATE entries SET search_vector = {SEARCH_VECTOR_EXPRESSION} "
+                    f"WHERE id > :last AND id <= :upto AND search_vector IS NULL"
+                ), {"last": last_id, "upto": upto})
+                backfilled += result.rowcount
+                last_id = upto
+
+    async with async_engine.connect() as conn:
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        tables = await _entry_tables(conn)
+        if tables == ["entries"]:
+            await _build_index_concurrently(conn, "entries", SEARCH_INDEX)
+        else:
+            await conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON ONLY entries USING gin (search_vector)"
+            ))
+            attached = {name for (name,) in (await conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :index"
+            ), {"index": SEARCH_INDEX})).all()}
+            for table in tables:
+                index = f"{table}_search_vector_idx"
+                if index in attached:
+                    continue
+                await _build_index_concurrently(conn, table, index)
+                # The parent index becomes valid once every partition's index is attached
+                await conn.execute(text(f"ALTER INDEX {SEARCH_INDEX} ATTACH PARTITION {index}"))
+    return backfilled
+
+
+if __name__ == "__main__":
+    # Add the search column and index to an existing entries table: python -m app.services.history.search
+    import asyncio
+
+    async def _add_search_column():
+        backfilled = await add_search_column()
+        print(f"Backfilled search documents for {backfilled} entries")
+        print("Entries search column and index ready")
+
+    asyncio.run(_add_search_column())
@@ -0,0 +1,144 @@
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import Date, String, select, delete, func, cast
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.entry import Entry
+from app.models.topic_day import UserTopicDay
+from app.services.history.counters import entry_kind
+
+MAX_TREND_DAYS = 365
+
+def topic_day_deltas(entries: Iterable[Dict]) -> Dict[Tuple[int, str, date, str], int]:
+    """Count new entries per (user_id, kind, UTC day of created_at, topic)"""
+    today = datetime.now(timezone.utc).date()
+    return dict(Counter(
+        (
+            entry["user_id"],
+            entry_kind(entry["type"]),
+            entry["created_at"].astimezone(timezone.utc).date() if entry.get("created_at") else today,
+            entry["topic"],
+        )
+        for entry in entries
+        if entry.get("user_id")
+    ))
+
+
+async def increment_topic_days(db: AsyncSession, deltas: Dict[Tuple[int, str, str], int]) -> None:
+    """
+    Add topic counts to their days' rollups inside the caller's transaction
+
+    Args:
+        db: Database session; the caller commits
+        deltas: Mapping of (user_id, kind, day, topic) to the number of new entries
+    """
+    rows = [
+        {"user_id": user_id, "kind": kind, "day": day, "topic": topic, "count": delta}
+        # Sorted so concurrent transactions lock rollup rows in the same order
+        for (user_id, kind, day, topic), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+
+    statement = pg_insert(UserTopicDay).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserTopicDay.user_id, UserTopicDay.kind, UserTopicDay.day, UserTopicDay.topic],
+        set_={"count": UserTopicDay.count + statement.excluded.count},
+    )
+    await db.execute(statement)
+
+
+async def get_trend(
+    db: AsyncSession,
+    user_id: int,
+    days: int,
+    kind: str,
+    today: Optional[date] = None,
+) -> Dict:
+    """
+    Topic distribution over the last `days` UTC days, including today
+
+    Args:
+        db: Database session
+        user_id: User whose entries to summarize
+        days: Window length in days
+        kind: Entry kind (feel or devotion)
+        today: Optional last day of the window, defaults to today in UTC
+
+    Returns:
+        Dictionary with the window, per-topic totals and shares, and a daily series
+    """
+    if today is None:
+        today = datetime.now(timezone.utc).date()
+    since = today - timedelta(days=days - 1)
+
+    result = await db.execute(
+        select(UserTopicDay.day, UserTopicDay.topic, UserTopicDay.count)
+        .where(
+            UserTopicDay.user_id == user_id,
+            UserTopicDay.kind == kind,
+            UserTopicDay.day >= since,
+            UserTopicDay.day <= today,
+        )
+        .order_by(UserTopicDay.day)
+    )
+
+    totals = Counter()
+    series: Dict[date, Dict[str, int]] = {}
+    for day, topic, count in result.all():
+        totals[topic] += count
+        series.setdefault(day, {})[topic] = count
+
+    total = sum(totals.values())
+    return {
+        "days": days,
+        "since": since,
+        "until": today,
+        "total": total,
+        "topics": [
+            {"topic": topic, "count": count, "share": round(count / total, 4)}
+            for topic, count in totals.most_common()
+        ],
+        "series": [{"day": day, "topics": topics} for day, topics in series.items()],
+    }
+
+
+async def rebuild_topic_days(db: AsyncSession, user_id: Optional[int] = None) -> None:
+    """
+    Rebuild the daily topic rollups from the entries table
+
+    Args:
+        db: Database session
+        user_id: Optional user to rebuild; all users when omitted
+    """
+    day = cast(func.timezone("UTC", Entry.created_at), Date)
+    kind = func.lower(cast(Entry.type, String))
+    counts = select(Entry.user_id, kind, day, Entry.topic, func.count()).where(
+        Entry.user_id.isnot(None)
+    ).group_by(Entry.user_id, kind, day, Entry.topic)
+
+    clear = delete(UserTopicDay)
+    if user_id is not None:
+        counts = counts.where(Entry.user_id == user_id)
+        clear = clear.where(UserTopicDay.user_id == user_id)
+
+    await db.execute(clear)
+    await db.execute(
+        pg_insert(UserTopicDay).from_select(["user_id", "kind", "day", "topic", "count"], counts)
+    )
+    await db.commit()
+
+
+if __name__ == "__main__":
+    # Backfill or repair rollups: python -m app.services.history.trends
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+
+    async def _rebuild():
+        async with AsyncSessionLocal() as db:
+            await rebuild_topic_days(db)
+        print("Rebuilt daily topic rollups")
+
+    asyncio.run(_rebuild())
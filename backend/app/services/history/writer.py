@@ -0,0 +1,349 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.entry import EntryType
+from app.services.history.entries import save_entries
+
+logger = logging.getLogger("abide")
+
+_STOP = object()
+
+# Errors caused by one row's values; any other error would fail every row alike
+ROW_ERRORS = (DataError, IntegrityError)
+
+
+class EntryWriter:
+    """
+    Write-behind buffer for history entries
+
+    Entries are queued in process and flushed by a background task with
+    one multi-row INSERT per batch, once the batch is full or the flush
+    interval has passed. Entries may take up to one flush interval to
+    show up in history.
+
+    A batch that keeps failing is written row by row so one bad row can't
+    sink the rest; rows that still fail are spilled to disk for
+    replay_spilled_entries rather than dropped.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10000,
+        enqueue_timeout: float = 1.0,
+        max_retries: int = 3,
+        spill_dir: str = "spill/entries",
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.spill_dir = spill_dir
+        self.session_factory = session_factory
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Metrics
+        self.enqueued = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.direct_writes = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._closing
+
+    def start(self) -> None:
+        """Start the background flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, entries: List[Dict]) -> None:
+        """
+        Queue entries for the next flush
+
+        When the queue is full the caller waits for room, up to the enqueue
+        timeout, and then writes its remaining entries itself.
+
+        Args:
+            entries: Entry column values, as accepted by save_entries
+        """
+        for index, entry in enumerate(entries):
+            try:
+                await asyncio.wait_for(self.queue.put(entry), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                remaining = entries[index:]
+                logger.warning("Entry write queue full, writing %d entries directly", len(remaining))
+                async with self.session_factory() as db:
+                    await save_entries(db, remaining)
+                self.direct_writes += len(remaining)
+                return
+            self.enqueued += 1
+
+    async def close(self) -> None:
+        """Stop accepting entries and flush everything already queued"""
+        if self._task is None:
+            return
+
+        self._closing = True
+        await self.queue.put(_STOP)
+        await self._task
+        self._task = None
+
+        # Entries queued by requests that raced the shutdown
+        leftover = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            await self._flush(leftover)
+
+    def stats(self) -> Dict:
+        """Queue depth and flush latency metrics"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "direct_writes": self.direct_writes,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "last_flush_latency_ms": round(self.last_flush_latency * 1000, 2),
+            "max_flush_latency_ms": round(self.max_flush_latency * 1000, 2),
+            "avg_flush_latency_ms": round(self.total_flush_latency / self.flushes * 1000, 2) if self.flushes else 0.0,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                # Drain whatever is already queued before waiting on the clock
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict]) -> None:
+        started = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.session_factory() as db:
+                    await save_entries(db, batch)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("Entry flush failed %d times, writing %d entries one by one: %r", attempt + 1, len(batch), e)
+                    await self._salvage(batch)
+                    return
+                logger.warning("Entry flush failed, retrying: %r", e)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+        latency = time.perf_counter() - started
+        self.flushed += len(batch)
+        self.flushes += 1
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+    async def _salvage(self, batch: List[Dict]) -> None:
+        """Write a failed batch row by row, spilling the rows that still fail"""
+        failed = []
+        for index, entry in enumerate(batch):
+            try:
+                async with self.session_factory() as db:
+                    await save_entries(db, [entry])
+                self.flushed += 1
+            except ROW_ERRORS as e:
+                logger.error("Entry for user %s rejected: %r", entry.get("user_id"), e)
+                failed.append(entry)
+            except Exception as e:
+                # The database itself is failing, so don't wait on it once per row
+                logger.error("Entry writes failing, spilling %d entries: %r", len(batch) - index, e)
+                failed.extend(batch[index:])
+                break
+
+        if failed:
+            await self._spill(failed)
+
+    async def _spill(self, entries: List[Dict]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            path = await loop.run_in_executor(None, spill_entries, self.spill_dir, entries)
+        except (OSError, TypeError, ValueError) as e:
+            self.dropped += len(entries)
+            logger.critical("Dropped %d entries, spilling them failed: %r", len(entries), e)
+            return
+
+        self.spilled += len(entries)
+        logger.error("Spilled %d entries to %s; replay with python -m app.services.history.writer", len(entries), path)
+
+
+def spill_entries(directory: str, entries: List[Dict]) -> str:
+    """
+    Write entries to a new JSON lines file for later replay
+
+    The file is written under a temporary name and renamed into place, so
+    a replay never reads a partial file. Blocking; run it off the event loop.
+
+    Returns:
+        Path of the spill file
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = os.path.join(directory, f"entries-{stamp}-{os.getpid()}.jsonl")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for entry in entries:
+            record = {**entry, "created_at": entry["created_at"].isoformat()} if entry.get("created_at") else entry
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+async def replay_spilled_entries(
+    directory: str,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> Tuple[int, int]:
+    """
+    Write spilled entries to the database, deleting each file once it's saved
+
+    Each file is saved in one transaction, so a file that fails again is
+    left in place whole; fix the rejected row and replay again.
+
+    Returns:
+        (entries replayed, files left)
+    """
+    if not os.path.isdir(directory):
+        return 0, 0
+
+    replayed = 0
+    left = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".jsonl"):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        for entry in entries:
+            entry["type"] = EntryType(entry["type"])
+            if entry.get("created_at"):
+                entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+
+        try:
+            async with session_factory() as db:
+                await save_entries(db, entries)
+        except Exception as e:
+            logger.error("Replaying %s failed: %r", name, e)
+            left += 1
+            continue
+
+        os.remove(path)
+        replayed += len(entries)
+    return replayed, left
+
+
+_entry_writer: Optional[EntryWriter] = None
+
+
+def start_entry_writer() -> EntryWriter:
+    """Create and start the process-wide entry writer"""
+    global _entry_writer
+
+    if _entry_writer is None:
+        _entry_writer = EntryWriter(
+            batch_size=settings.ENTRY_WRITE_BATCH_SIZE,
+            flush_interval=settings.ENTRY_WRITE_FLUSH_INTERVAL,
+            max_queue_size=settings.ENTRY_WRITE_QUEUE_SIZE,
+            enqueue_timeout=settings.ENTRY_WRITE_ENQUEUE_TIMEOUT,
+            spill_dir=settings.ENTRY_WRITE_SPILL_DIR,
+        )
+        _entry_writer.start()
+
+    return _entry_writer
+
+
+def get_entry_writer() -> Optional[EntryWriter]:
+    """Get the process-wide entry writer, if write-behind is running"""
+    return _entry_writer
+
+
+async def close_entry_writer() -> None:
+    """Drain and stop the process-wide entry writer"""
+    global _entry_writer
+
+    if _entry_writer is not None:
+        await _entry_writer.close()
+        _entry_writer = None
+
+
+async def persist_entries(db: AsyncSession, entries: List[Dict]) -> None:
+    """
+    Persist entries through the write-behind queue when it's running,
+    otherwise write them in the caller's session
+
+    Entries are stamped with created_at here, so a queued, retried or
+    spilled entry keeps the time the user made it.
+
+    Args:
+        db: Database session used for direct writes
+        entries: Entry column values (user_id, type, topic, input_text, response_json)
+    """
+    if not entries:
+        return
+
+    now = datetime.now(timezone.utc)
+    entries = [{**entry, "created_at": entry.get("created_at") or now} for entry in entries]
+
+    writer = _entry_writer
+    if writer is not None and writer.running:
+        await writer.enqueue(entries)
+    else:
+        await save_entries(db, entries)
+
+
+if __name__ == "__main__":
+    # Replay entries spilled by failed flushes: python -m app.services.history.writer
+    async def _replay():
+        replayed, left = await replay_spilled_entries(settings.ENTRY_WRITE_SPILL_DIR)
+        print(f"Replayed {replayed} entries, {left} spill files left")
+
+    asyncio.run(_replay())
@@ -2,14 +2,43 @@ import httpx
 from typing import List, Dict, Optional
 from app.core.config import settings
 from app.core.database import redis_client
+from app.core.metrics import timed, record_cache
 import json
 
+# Fallback videos used when the YouTube API is unavailable
+FALLBACK_VIDEOS = {
+    "peace": {
+        "videoId": "dQw4w9WgXcQ",  # Placeholder
+        "title": "Peaceful Christian Worship",
+        "channelTitle": "Christian Music",
+        "thumbnailUrl": "https://via.placeholder.com/320x180/4F46E5/FFFFFF?text=Peace+Worship",
+        "duration": 300,
+        "description": "A peaceful worship song to help you find God's peace."
+    },
+    "hope": {
+        "videoId": "dQw4w9WgXcQ",  # Placeholder
+        "title": "Hope in Christ",
+        "channelTitle": "Christian Devotionals",
+        "thumbnailUrl": "https://via.placeholder.com/320x180/059669/FFFFFF?text=Hope+Devotional",
+        "duration": 300,
+        "description": "A devotional message about finding hope in Christ."
+    },
+    "comfort": {
+        "videoId": "dQw4w9WgXcQ",  # Placeholder
+        "title": "Comfort from Scripture",
+        "channelTitle": "Bible Study",
+        "thumbnailUrl": "https://via.placeholder.com/320x180/DC2626/FFFFFF?text=Comfort+Scripture",
+        "duration": 300,
+        "description": "Scripture readings to bring comfort in difficult times."
+    }
+}
+
 class YouTubeService:
     """Service for finding relevant YouTube content"""
     
     def __init__(self):
         self.api_key = settings.YOUTUBE_API_KEY
-        self.base_url = "https://www.googleapis.com/youtube/v3"
+        self.base_url = settings.YOUTUBE_API_BASE
         self.cache_ttl = 3600  # 1 hour cache
     
     async def search_christian_content(self, theme: str, max_duration: int = 600) -> Optional[Dict]:
@@ -30,6 +59,7 @@ class YouTubeService:
         # Check cache first
         cache_key = f"youtube_search:{theme}:{max_duration}"
         cached_result = redis_client.get(cache_key)
+        record_cache("youtube", cached_result is not None)
         if cached_result:
             return json.loads(cached_result)
         
@@ -50,8 +80,9 @@ class YouTubeService:
             }
             
             async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/search", params=params)
-                response.raise_for_status()
+                with timed("youtube_api"):
+                    response = await client.get(f"{self.base_url}/search", params=params)
+                    response.raise_for_status()
                 
                 search_results = response.json()
                 
@@ -104,8 +135,9 @@ class YouTubeService:
         }
         
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/videos", params=params)
-            response.raise_for_status()
+            with timed("youtube_api"):
+                response = await client.get(f"{self.base_url}/videos", params=params)
+                response.raise_for_status()
             
             return response.json().get("items", [])
     
@@ -126,35 +158,8 @@ class YouTubeService:
     
     def _get_fallback_content(self, theme: str) -> Dict:
         """Return fallback content when YouTube API is unavailable"""
-        fallback_videos = {
-            "peace": {
-                "videoId": "dQw4w9WgXcQ",  # Placeholder
-                "title": "Peaceful Christian Worship",
-                "channelTitle": "Christian Music",
-                "thumbnailUrl": "https://via.placeholder.com/320x180/4F46E5/FFFFFF?text=Peace+Worship",
-                "duration": 300,
-                "description": "A peaceful worship song to help you find God's peace."
-            },
-            "hope": {
-                "videoId": "dQw4w9WgXcQ",  # Placeholder
-                "title": "Hope in Christ",
-                "channelTitle": "Christian Devotionals",
-                "thumbnailUrl": "https://via.placeholder.com/320x180/059669/FFFFFF?text=Hope+Devotional",
-                "duration": 300,
-                "description": "A devotional message about finding hope in Christ."
-            },
-            "comfort": {
-                "videoId": "dQw4w9WgXcQ",  # Placeholder
-                "title": "Comfort from Scripture",
-                "channelTitle": "Bible Study",
-                "thumbnailUrl": "https://via.placeholder.com/320x180/DC2626/FFFFFF?text=Comfort+Scripture",
-                "duration": 300,
-                "description": "Scripture readings to bring comfort in difficult times."
-            }
-        }
-        
         # Return theme-specific fallback or default
-        return fallback_videos.get(theme.lower(), fallback_videos["peace"])
+        return dict(FALLBACK_VIDEOS.get(theme.lower(), FALLBACK_VIDEOS["peace"]))
     
     async def get_worship_songs(self, theme: str) -> List[Dict]:
         """Get worship songs related to a theme"""
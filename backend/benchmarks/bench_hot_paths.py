@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot pure-Python request paths, gated on stored baselines
+
+Each case runs over a seeded workload drawn from realistic input sizes
+(short, typical and long feeling texts; known and free-text topics; common
+video durations) and reports nanoseconds per call. Each case is timed in
+rounds alternating with a fixed calibration loop, and the ratio between
+the two is compared with baselines.json, so baselines recorded on one
+machine stay meaningful on another of the same Python version. The run fails when a case is slower than its baseline by
+more than the threshold.
+
+    cd backend && python benchmarks/bench_hot_paths.py            # compare with baselines
+    cd backend && python benchmarks/bench_hot_paths.py --save     # record new baselines
+    cd backend && python benchmarks/bench_hot_paths.py -k crisis  # only matching cases
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.crisis_detection import CrisisDetector
+from app.services.ai.fragments import get_response_fragments
+from app.services.ai.response_generator import ResponseGenerator, FEELING_TEMPLATES, DEVOTION_TEMPLATES, KEYWORD_MAPPINGS
+from app.services.bible.public_domain import PublicDomainProvider, TOPIC_VERSES, COMMON_VERSES
+from app.services.catalog.devotion_catalog import DevotionCatalog
+from app.services.youtube.youtube_service import YouTubeService, FALLBACK_VIDEOS
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 0.30  # allowed slowdown over baseline before the run fails
+SEED = 2024
+INPUTS_PER_CASE = 200
+MIN_ROUND_TIME = 0.05  # seconds per timed round; loops are scaled up to reach it
+ROUNDS = 7
+RETRIES = 2  # re-measurements of a case over the threshold, to rule out a noisy round
+
+# Everyday words feeling texts are built from
+FILLER_WORDS = (
+    "i today feel really just so much work family my the and a to of it is was been have "
+    "lately friend church prayer week night morning tired trying know what do with life"
+).split()
+CRISIS_PHRASES = ["want to die", "hurt myself", "no reason to live"]
+
+# Lognormal word counts, clipped into each size bucket
+TEXT_SIZES = {
+    "short": (1, 10),
+    "typical": (11, 60),
+    "long": (61, 400),
+}
+
+
+def feeling_texts(rng: random.Random, size: str, count: int = INPUTS_PER_CASE) -> List[str]:
+    """Feeling texts of one size bucket; about a third mention a topic keyword and 2% a crisis phrase"""
+    low, high = TEXT_SIZES[size]
+    keywords = [keyword for group in KEYWORD_MAPPINGS.values() for keyword in group]
+    texts = []
+    while len(texts) < count:
+        words = int(rng.lognormvariate(math.log(18), 0.9))
+        if not low <= words <= high:
+            continue
+        text = [rng.choice(FILLER_WORDS) for _ in range(words)]
+        if rng.random() < 0.35:
+            text[rng.randrange(words)] = rng.choice(keywords)
+        if rng.random() < 0.02:
+            text.insert(rng.randrange(words), rng.choice(CRISIS_PHRASES))
+        texts.append(" ".join(text))
+    return texts
+
+
+def topics(rng: random.Random, count: int = INPUTS_PER_CASE) -> List[str]:
+    """Topics as requests send them: mostly known topics, some free-text themes that miss"""
+    known = list(TOPIC_VERSES) + list(DEVOTION_TEMPLATES)
+    return [
+        rng.choice(known) if rng.random() < 0.8 else rng.choice(["grief", "work stress", "new baby", "Forgiveness"])
+        for _ in range(count)
+    ]
+
+
+def durations(rng: random.Random, count: int = INPUTS_PER_CASE) -> List[str]:
+    """ISO 8601 durations as the YouTube API returns them, with the odd unparseable one"""
+    values = []
+    for _ in range(count):
+        seconds = int(rng.lognormvariate(math.log(420), 0.8))
+        hours, rest = divmod(seconds, 3600)
+        minutes, secs = divmod(rest, 60)
+        value = "PT" + (f"{hours}H" if hours else "") + (f"{minutes}M" if minutes else "") + (f"{secs}S" if secs else "")
+        values.append(value if rng.random() > 0.02 else "P1D")
+    return values
+
+
+def run_coroutine(coroutine):
+    """Run a coroutine that never suspends, without the cost of an event loop per call"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("benchmarked coroutine suspended")
+
+
+def build_cases() -> Dict[str, Callable[[], None]]:
+    """Map case names to callables that process their whole workload once"""
+    rng = random.Random(SEED)
+    detector = CrisisDetector()
+    generator = ResponseGenerator()
+    provider = PublicDomainProvider()
+    youtube = YouTubeService()
+    fragments = get_response_fragments()
+    cases: Dict[str, Tuple[Callable, List]] = {}
+
+    for size in TEXT_SIZES:
+        texts = feeling_texts(rng, size)
+        cases[f"crisis.detect_crisis[{size}]"] = (detector.detect_crisis, texts)
+        cases[f"generator.classify_feeling[{size}]"] = (generator._classify_feeling, texts)
+
+    crisis_texts = [f"{text} {rng.choice(CRISIS_PHRASES)}" for text in feeling_texts(rng, "typical")]
+    cases["crisis.get_crisis_response[typical]"] = (detector.get_crisis_response, crisis_texts)
+
+    references = [verse["reference"] for verses in TOPIC_VERSES.values() for verse in verses]
+    lookups = [
+        [rng.choice(references) if rng.random() < 0.9 else "Obadiah 1:1" for _ in range(rng.choice([1, 1, 2, 3]))]
+        for _ in range(INPUTS_PER_CASE)
+    ]
+    cases["bible.get_verses[1-3 refs]"] = (lambda refs: run_coroutine(provider.get_verses(refs)), lookups)
+
+    queries = [rng.choice(["peace", "hope", "LORD", "heart", "strength", "fear not", "joy", "xyz"]) for _ in range(INPUTS_PER_CASE)]
+    cases["bible.search_verses[keyword]"] = (lambda query: run_coroutine(provider.search_verses(query)), queries)
+
+    topic_list = topics(rng)
+    cases["bible.get_random_verses[topic]"] = (lambda topic: run_coroutine(provider.get_random_verses(topic, seed=topic)), topic_list)
+    cases["bible.get_random_verses_batch[100]"] = (
+        lambda batch: run_coroutine(provider.get_random_verses_batch(batch)),
+        [topic_list[i:i + 100] for i in range(0, len(topic_list), 100)],
+    )
+
+    cases["youtube.parse_duration"] = (youtube._parse_duration, durations(rng))
+
+    feeling_responses = [
+        {
+            "verses": rng.sample(TOPIC_VERSES.get(topic, COMMON_VERSES), 2),
+            "reflection": template["reflection"],
+            "prayer": template["prayer"],
+            "topic": topic,
+        }
+        for topic, template in (rng.choice(list(FEELING_TEMPLATES.items())) for _ in range(INPUTS_PER_CASE))
+    ]
+    cases["serialize.feeling_response"] = (lambda response: fragments.feeling_response(**response), feeling_responses)
+
+    devotions = []
+    for theme in (rng.choice(list(DEVOTION_TEMPLATES)) for _ in range(INPUTS_PER_CASE)):
+        template = DEVOTION_TEMPLATES[theme]
+        devotions.append({
+            "plan": {
+                **{key: template[key] for key in ("opening_prayer", "reflection", "action_steps", "closing_prayer")},
+                "scriptures": rng.sample(COMMON_VERSES, 3),
+            },
+            "video": FALLBACK_VIDEOS.get(theme, FALLBACK_VIDEOS["peace"]),
+            "theme": theme,
+        })
+    cases["serialize.devotion_response"] = (DevotionCatalog.serialize, devotions)
+
+    def over_workload(func: Callable, inputs: List) -> Callable[[], None]:
+        def run():
+            for value in inputs:
+                func(value)
+        run.calls = len(inputs)
+        return run
+
+    return {name: over_workload(func, inputs) for name, (func, inputs) in cases.items()}
+
+
+def calibration() -> None:
+    """Fixed pure-Python workload used to normalize timings across machines"""
+    words = FILLER_WORDS * 4
+    counts: Dict[str, int] = {}
+    for word in words:
+        counts[word.lower()] = counts.get(word.lower(), 0) + len(word)
+    " ".join(sorted(counts)).find("week")
+calibration.calls = 1
+
+
+def measure(run: Callable[[], None]) -> Tuple[float, float]:
+    """
+    Time a case against the calibration loop in alternating rounds
+
+    Alternating keeps a slow stretch on a shared or throttled machine from
+    skewing the ratio, since both sides of it are measured in that stretch.
+
+    Returns:
+        Best nanoseconds per call, and best time per call relative to the calibration loop
+    """
+    # Collections would land in whichever round happens to trigger them, as in timeit
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        run_loops, unit_loops = _loops_for(run), _loops_for(calibration)
+        best_run = best_unit = math.inf
+        for _ in range(ROUNDS):
+            best_run = min(best_run, _time_round(run, run_loops))
+            best_unit = min(best_unit, _time_round(calibration, unit_loops))
+        return best_run * 1e9, best_run / best_unit
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _loops_for(run: Callable[[], None]) -> int:
+    """Number of loops that makes a round take at least MIN_ROUND_TIME"""
+    loops = 1
+    while True:
+        elapsed = _time_round(run, loops) * loops * run.calls
+        if elapsed >= MIN_ROUND_TIME:
+            return loops
+        loops *= 2 if elapsed == 0 else max(2, int(MIN_ROUND_TIME / elapsed * 1.2))
+
+
+def _time_round(run: Callable[[], None], loops: int) -> float:
+    """Seconds per call over one round"""
+    started = time.perf_counter()
+    for _ in range(loops):
+        run()
+    return (time.perf_counter() - started) / (loops * run.calls)
+
+
+def load_baselines() -> Dict:
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--save", action="store_true", help="record the results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, e.g. 0.3 for 30%%")
+    parser.add_argument("-k", dest="pattern", default="", help="only run cases whose name contains this")
+    args = parser.parse_args()
+
+    cases = {name: run for name, run in build_cases().items() if args.pattern in name}
+    if not cases:
+        print(f"No cases match {args.pattern!r}")
+        return 1
+
+    baselines = load_baselines()
+    baseline_cases = baselines.get("cases", {})
+    if baselines and baselines.get("python") != platform.python_version():
+        print(f"Note: baselines were recorded on Python {baselines.get('python')}, this is {platform.python_version()}")
+
+    print(f"{'case':42} {'ns/call':>10} {'baseline':>10} {'change':>8}")
+
+    results = {}
+    regressions = []
+    for name, run in cases.items():
+        ns, normalized = measure(run)
+        results[name] = {"ns_per_call": round(ns, 1), "normalized": round(normalized, 4)}
+
+        baseline = baseline_cases.get(name)
+        if baseline is None:
+            print(f"{name:42} {ns:10.1f} {'-':>10} {'new':>8}")
+            continue
+
+        change = normalized / baseline["normalized"] - 1
+        for _ in range(RETRIES):
+            if change <= args.threshold:
+                break
+            retry_ns, retry_normalized = measure(run)
+            ns, normalized = min(ns, retry_ns), min(normalized, retry_normalized)
+            results[name] = {"ns_per_call": round(ns, 1), "normalized": round(normalized, 4)}
+            change = normalized / baseline["normalized"] - 1
+
+        flag = ""
+        if change > args.threshold:
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:42} {ns:10.1f} {baseline['ns_per_call']:10.1f} {change:+8.1%}{flag}")
+
+    if args.save:
+        baseline_cases.update(results)
+        with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "cases": dict(sorted(baseline_cases.items())),
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved {len(results)} baselines to {os.path.relpath(BASELINES_PATH)}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+
+    print(f"\nAll {len(results)} cases within {args.threshold:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark /feel response serialization
+
+Compares the previous path (build a FeelingResponse, then let FastAPI
+re-validate it through response_model and JSON-encode it) with assembling
+the body from pre-encoded fragments.
+
+    cd backend && python benchmarks/bench_serialization.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.api.v1.feeling import router as feeling_router
+from app.schemas.feeling import FeelingResponse
+from app.services.ai.fragments import get_response_fragments
+from app.services.ai.response_generator import FEELING_TEMPLATES
+from app.services.bible.public_domain import TOPIC_VERSES
+
+ITERATIONS = 20000
+
+
+def build_response(topic: str) -> dict:
+    template = FEELING_TEMPLATES[topic]
+    return {
+        "verses": TOPIC_VERSES[topic][:2],
+        "reflection": template["reflection"],
+        "prayer": template["prayer"],
+        "topic": topic,
+    }
+
+
+async def pydantic_path(field, response: dict) -> bytes:
+    model = FeelingResponse(**response)
+    content = await serialize_response(field=field, response_content=model)
+    return JSONResponse(content).body
+
+
+def fragment_path(fragments, response: dict) -> bytes:
+    return fragments.feeling_response(**response)
+
+
+async def main():
+    field = next(route for route in feeling_router.routes if route.path == "/").secure_cloned_response_field
+    fragments = get_response_fragments()
+    responses = [build_response(topic) for topic in FEELING_TEMPLATES]
+
+    # Both paths must produce the same document
+    for response in responses:
+        assert await pydantic_path(field, response) == fragment_path(fragments, response)
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        await pydantic_path(field, responses[i % len(responses)])
+    baseline = (time.perf_counter() - start) / ITERATIONS
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fragment_path(fragments, responses[i % len(responses)])
+    optimized = (time.perf_counter() - start) / ITERATIONS
+
+    print(f"response_model + JSONResponse: {baseline * 1e6:8.2f} us/response")
+    print(f"pre-encoded fragments:         {optimized * 1e6:8.2f} us/response")
+    print(f"speedup:                       {baseline / optimized:8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
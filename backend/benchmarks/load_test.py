@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Hermetic end-to-end load test, gated on latency SLOs
+
+Boots the real app under uvicorn against local stand-ins: an embedded
+Postgres (pgserver), a Redis-protocol server (fakeredis) and a stub of the
+YouTube Data API, so no external service is touched. After seeding users it
+drives a weighted mix of /feel, /devotion and /history traffic from a fixed
+number of concurrent clients, each sending its next request as soon as the
+previous one returns, then reports p50/p95/p99 latency and throughput per
+endpoint. The run fails when an SLO or the error budget is breached.
+
+The stand-ins run in their own process so they don't compete with the load
+generator for the GIL; the load generator itself is a single event loop, so
+at high concurrency check that it isn't the bottleneck (throughput that stops
+growing while latency stays flat).
+
+    cd backend && pip install -r requirements-loadtest.txt
+    cd backend && python benchmarks/load_test.py
+    cd backend && python benchmarks/load_test.py --concurrency 64 --duration 60 --mix feel=6,devotion=1,history=3
+    cd backend && python benchmarks/load_test.py --slo p99=800 --slo history:p95=50 --json report.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import asyncpg
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SEED = 2024
+DEFAULT_MIX = "feel=5,devotion=2,history=3"
+DEFAULT_SLOS = ["p95=500", "p99=1000"]  # milliseconds, over all requests
+STARTUP_TIMEOUT = 60.0  # seconds for the app to answer /health
+
+# Feeling texts are one or two of these, so classification sees a spread of topics
+FEELINGS = [
+    "I feel anxious about work and can't stop worrying",
+    "I'm so grateful for my family today",
+    "I've been lonely since moving to a new city",
+    "I'm angry at a friend who let me down",
+    "I feel lost and don't know what to do with my life",
+    "I'm grieving my grandmother and miss her every day",
+    "I'm tired and overwhelmed by everything on my plate",
+    "I feel hopeful about a new job",
+    "I'm struggling to forgive my brother",
+    "I feel guilty about how I spoke to my kids",
+    "I'm afraid of what the doctor will say",
+    "I feel at peace after church this morning",
+]
+
+
+# Stand-ins
+
+class YouTubeStubHandler(BaseHTTPRequestHandler):
+    """Answers the two YouTube Data API calls the app makes with fixed, valid videos"""
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        path = urlparse(self.path).path
+        if path.endswith("/search"):
+            body = {"items": [{"id": {"videoId": f"stub{i}"}} for i in range(5)]}
+        elif path.endswith("/videos"):
+            body = {"items": [
+                {
+                    "id": f"stub{i}",
+                    "snippet": {
+                        "title": f"Worship session {i}",
+                        "channelTitle": "Load Test",
+                        "description": "Stub video served by the load test",
+                        "thumbnails": {"medium": {"url": f"https://example.com/stub{i}.jpg"}},
+                    },
+                    "contentDetails": {"duration": "PT5M12S"},
+                }
+                for i in range(5)
+            ]}
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve_stand_ins(conn, youtube_latency: float) -> None:
+    """Run the Redis and YouTube stand-ins until the parent closes `conn`"""
+    from fakeredis import TcpFakeServer
+
+    redis_server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    youtube_server = ThreadingHTTPServer(("127.0.0.1", 0), YouTubeStubHandler)
+    youtube_server.daemon_threads = True
+    youtube_server.latency = youtube_latency
+    for server in (redis_server, youtube_server):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    conn.send((redis_server.server_address[1], youtube_server.server_address[1]))
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+
+
+def start_stand_ins(youtube_latency: float) -> Tuple[multiprocessing.Process, object, str, str]:
+    """
+    Start the Redis and YouTube stand-ins in a child process
+
+    Returns:
+        The process, the pipe that keeps it alive, the Redis URL and the YouTube API base URL
+    """
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve_stand_ins, args=(child_conn, youtube_latency), daemon=True)
+    process.start()
+    redis_port, youtube_port = parent_conn.recv()
+    return process, parent_conn, f"redis://127.0.0.1:{redis_port}", f"http://127.0.0.1:{youtube_port}/youtube/v3"
+
+
+def start_app(port: int, workers: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    """Start the app under uvicorn, logging to `log_path`"""
+    log = open(log_path, "w", encoding="utf-8")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, app: subprocess.Popen, log_path: str) -> None:
+    """Poll /health until the app answers, or fail with the end of its log"""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if app.poll() is not None:
+            break
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+
+    with open(log_path, encoding="utf-8") as f:
+        tail = f.readlines()[-30:]
+    raise RuntimeError("App didn't become healthy:\n" + "".join(tail))
+
+
+async def seed_users(database_url: str, count: int) -> List[int]:
+    """Insert load test users and return their ids"""
+    conn = await asyncpg.connect(database_url)
+    try:
+        rows = await conn.fetch(
+            "INSERT INTO users (email, is_active, created_at) "
+            "SELECT 'loadtest-' || g || '@example.com', true, now() FROM generate_series(1, $1) AS g "
+            "RETURNING id",
+            count,
+        )
+    finally:
+        await conn.close()
+    return [row["id"] for row in rows]
+
+
+# Traffic
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse `feel=5,devotion=2,history=3` into endpoint weights"""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("feel", "devotion", "history"):
+            raise ValueError(f"Unknown endpoint {name!r} in mix; use feel, devotion or history")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+class TrafficMix:
+    """Builds requests for a weighted mix of endpoints"""
+
+    def __init__(self, mix: Dict[str, float], user_ids: List[int], themes: List[str], guest_ratio: float):
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.user_ids = user_ids
+        self.themes = themes
+        self.guest_ratio = guest_ratio
+
+    def _user_id(self, rng: random.Random) -> Optional[int]:
+        if rng.random() < self.guest_ratio:
+            return None
+        return rng.choice(self.user_ids)
+
+    def next(self, rng: random.Random) -> Tuple[str, str, str, Dict]:
+        """Returns (endpoint, method, path, httpx request kwargs)"""
+        name = rng.choices(self.names, self.weights)[0]
+        if name == "feel":
+            text = " and ".join(rng.sample(FEELINGS, rng.randint(1, 2)))
+            return name, "POST", "/api/v1/feel/", {"json": {"text": text, "user_id": self._user_id(rng)}}
+        if name == "devotion":
+            body = {"theme": rng.choice(self.themes), "user_id": self._user_id(rng)}
+            return name, "POST", "/api/v1/devotion/", {"json": body}
+        params = {"user_id": rng.choice(self.user_ids), "limit": 20}
+        return name, "GET", "/api/v1/history/entries", {"params": params}
+
+
+class Results:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Counter = Counter()
+        self.failures: Counter = Counter()  # (endpoint, status or exception name) -> count
+
+    def add(self, name: str, seconds: float, failure: Optional[str]) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+        if failure is not None:
+            self.errors[name] += 1
+            self.failures[(name, failure)] += 1
+
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    mix: TrafficMix,
+    rng: random.Random,
+    results: Optional[Results],
+    deadline: float,
+) -> None:
+    """Send requests back to back until the deadline; `results` is None during warmup"""
+    while time.perf_counter() < deadline:
+        name, method, path, kwargs = mix.next(rng)
+        started = time.perf_counter()
+        failure = None
+        try:
+            response = await client.request(method, path, **kwargs)
+            if response.status_code >= 400:
+                failure = str(response.status_code)
+        except httpx.HTTPError as e:
+            failure = type(e).__name__
+        if results is not None:
+            results.add(name, time.perf_counter() - started, failure)
+
+
+async def run_phase(client: httpx.AsyncClient, mix: TrafficMix, concurrency: int, duration: float, record: bool) -> Results:
+    """Run `concurrency` clients for `duration` seconds"""
+    results = Results()
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        client_loop(client, mix, random.Random(SEED + i), results if record else None, deadline)
+        for i in range(concurrency)
+    ))
+    return results
+
+
+# Reporting
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(results: Results, elapsed: float) -> Dict[str, Dict]:
+    """Per-endpoint and overall request counts, error rates, throughput and latency percentiles in ms"""
+    groups = dict(sorted(results.latencies.items()))
+    groups["all"] = [seconds for latencies in results.latencies.values() for seconds in latencies]
+
+    summary = {}
+    for name, latencies in groups.items():
+        latencies = sorted(latencies)
+        errors = sum(results.errors.values()) if name == "all" else results.errors[name]
+        summary[name] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": errors / len(latencies) if latencies else 0.0,
+            "throughput": len(latencies) / elapsed,
+            **{f"p{p}": percentile(latencies, p) * 1000 for p in (50, 95, 99)},
+            "max": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+    return summary
+
+
+def parse_slo(spec: str) -> Tuple[str, str, float]:
+    """Parse `p99=800` or `history:p95=50` into (endpoint, percentile, limit in ms)"""
+    target, _, limit = spec.partition("=")
+    endpoint, _, metric = target.rpartition(":")
+    if metric not in ("p50", "p95", "p99", "max") or not limit:
+        raise ValueError(f"Bad SLO {spec!r}; expected [endpoint:]p50|p95|p99|max=<ms>")
+    return endpoint or "all", metric, float(limit)
+
+
+def check_slos(
+    summary: Dict[str, Dict],
+    slos: List[Tuple[str, str, float]],
+    max_error_rate: float,
+    min_throughput: float,
+) -> List[str]:
+    """Return a description of every breached SLO"""
+    breaches = []
+    for endpoint, metric, limit in slos:
+        if endpoint not in summary:
+            breaches.append(f"{endpoint}:{metric} has no requests")
+        elif summary[endpoint][metric] > limit:
+            breaches.append(f"{endpoint}:{metric} {summary[endpoint][metric]:.1f} ms > {limit:g} ms")
+
+    overall = summary["all"]
+    if overall["error_rate"] > max_error_rate:
+        breaches.append(f"error rate {overall['error_rate']:.2%} > {max_error_rate:.2%}")
+    if overall["throughput"] < min_throughput:
+        breaches.append(f"throughput {overall['throughput']:.1f} req/s < {min_throughput:g} req/s")
+    return breaches
+
+
+def print_report(summary: Dict[str, Dict], results: Results) -> None:
+    print(f"\n{'endpoint':10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, row in summary.items():
+        print(
+            f"{name:10} {row['requests']:9d} {row['errors']:7d} {row['throughput']:8.1f} "
+            f"{row['p50']:8.1f} {row['p95']:8.1f} {row['p99']:8.1f} {row['max']:8.1f}"
+        )
+    for (name, failure), count in results.failures.most_common():
+        print(f"  {name}: {count} x {failure}")
+
+
+# Run
+
+async def drive(args, database_url: str, app: subprocess.Popen, log_path: str) -> Tuple[Dict[str, Dict], Results]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=args.timeout) as client:
+        await wait_until_healthy(client, app, log_path)
+        user_ids = await seed_users(database_url, args.users)
+        themes = (await client.get("/api/v1/devotion/themes")).json()["themes"]
+        mix = TrafficMix(parse_mix(args.mix), user_ids, themes, args.guest_ratio)
+
+        if args.warmup > 0:
+            print(f"Warming up for {args.warmup:g}s")
+            await run_phase(client, mix, args.concurrency, args.warmup, record=False)
+
+        print(f"Driving {args.mix} from {args.concurrency} clients for {args.duration:g}s")
+        started = time.perf_counter()
+        results = await run_phase(client, mix, args.concurrency, args.duration, record=True)
+        return summarize(results, time.perf_counter() - started), results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of unmeasured load first; also fills history")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. %(default)s")
+    parser.add_argument("--users", type=int, default=200, help="seeded users")
+    parser.add_argument("--guest-ratio", type=float, default=0.3, help="share of /feel and /devotion requests without a user")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--youtube-latency", type=float, default=0.1, help="seconds the YouTube stub takes per call")
+    parser.add_argument("--slo", action="append", help=f"[endpoint:]p50|p95|p99|max=<ms>, repeatable (default: {' '.join(DEFAULT_SLOS)})")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="allowed share of failed requests")
+    parser.add_argument("--min-throughput", type=float, default=0.0, help="required requests per second")
+    parser.add_argument("--json", dest="json_path", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    try:
+        slos = [parse_slo(spec) for spec in (args.slo or DEFAULT_SLOS)]
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    import pgserver
+
+    data_dir = tempfile.mkdtemp(prefix="abide-loadtest-")
+    log_path = os.path.join(data_dir, "app.log")
+    postgres = pgserver.get_server(os.path.join(data_dir, "pgdata"), cleanup_mode="stop")
+    database_url = postgres.get_uri()
+    stand_ins, stand_ins_conn, redis_url, youtube_url = start_stand_ins(args.youtube_latency)
+    app = start_app(args.port, args.workers, {
+        "DATABASE_URL": database_url,
+        "REDIS_URL": redis_url,
+        "YOUTUBE_API_KEY": "loadtest",
+        "YOUTUBE_API_BASE": youtube_url,
+        "REFLECTION_BACKEND": "template",
+        "ENVIRONMENT": "production",
+        "PROFILING_ENABLED": "false",
+    }, log_path)
+
+    try:
+        summary, results = asyncio.run(drive(args, database_url, app, log_path))
+    finally:
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        stand_ins_conn.close()
+        stand_ins.join(timeout=5)
+        postgres.cleanup()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_report(summary, results)
+    breaches = check_slos(summary, slos, args.max_error_rate, args.min_throughput)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "summary": summary, "breaches": breaches}, f, indent=2)
+            f.write("\n")
+
+    if breaches:
+        print(f"\n{len(breaches)} SLO(s) breached: " + "; ".join(breaches))
+        return 1
+
+    print(f"\nAll {len(slos)} latency SLOs met, error rate {summary['all']['error_rate']:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
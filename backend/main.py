@@ -1,15 +1,25 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import init_db, close_db, async_engine, async_read_engine
+from app.core.pool import pool_stats
+from app.core.metrics import REQUEST_DURATION, StatsCollector, start_request_timings, server_timing_header
+from app.core.profiling import StackSampler, wants_profile, profile_filename, write_profile
 from app.api.v1.api import api_router
 from app.core.crisis_detection import CrisisDetector
 from app.core.logging import setup_logging
+from app.services.ai import close_reflection_service
+from app.services.ai.fragments import get_response_fragments
+from app.services.catalog import get_devotion_catalog
+from app.services.history import start_entry_writer, get_entry_writer, close_entry_writer, run_partition_maintenance_forever
 
 load_dotenv()
 
@@ -18,9 +28,24 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     setup_logging()
+    get_response_fragments()
+    if settings.ENTRY_WRITE_BEHIND:
+        start_entry_writer()
+    background_tasks = [asyncio.create_task(
+        run_partition_maintenance_forever(settings.PARTITION_MAINTENANCE_INTERVAL)
+    )]
+    if settings.DEVOTION_CATALOG_ENABLED:
+        background_tasks.append(asyncio.create_task(
+            get_devotion_catalog().run_forever(settings.DEVOTION_CATALOG_REFRESH_INTERVAL)
+        ))
     yield
-    # Shutdown
-    pass
+    # Shutdown; background tasks finish unwinding before the connections they use are closed
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_entry_writer()
+    await close_reflection_service()
+    await close_db()
 
 app = FastAPI(
     title="Abide: Christian AI Companion",
@@ -67,6 +92,69 @@ async def crisis_detection_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Request metrics middleware, outside the crisis and CORS middleware so its timings cover them
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+    
+    started = time.perf_counter()
+    timings = start_request_timings()
+    response = await call_next(request)
+    # Streaming responses are measured to their headers; the body may still be in flight
+    elapsed = time.perf_counter() - started
+    
+    # Label by route template so path parameters don't multiply series
+    route = request.scope.get("route")
+    REQUEST_DURATION.labels(
+        request.method, route.path if route else "unmatched", response.status_code
+    ).observe(elapsed)
+    
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+if settings.PROFILING_ENABLED:
+    app.state.profiling = False
+    
+    # Sampled profiling middleware; not installed at all when disabled. Starlette runs the
+    # middleware added last outermost, so requests pass profiling -> metrics -> crisis -> CORS,
+    # and the metrics timings don't include the profiler's overhead
+    @app.middleware("http")
+    async def profiling_middleware(request: Request, call_next):
+        # One profile at a time: the sampler already sees everything on the event loop
+        if app.state.profiling or not wants_profile(
+            request.headers.get("x-profile"), settings.PROFILE_TOKEN, settings.PROFILE_SAMPLE_RATE
+        ):
+            return await call_next(request)
+        
+        app.state.profiling = True
+        sampler = StackSampler(settings.PROFILE_INTERVAL)
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            sampler.stop()
+            app.state.profiling = False
+        
+        filename = profile_filename(request.method, request.url.path, sampler.duration, settings.PROFILE_FORMAT)
+        # Written in the background so the dump doesn't delay the response
+        asyncio.get_running_loop().run_in_executor(
+            None, write_profile, sampler, settings.PROFILE_DIR, filename, settings.PROFILE_FORMAT, settings.PROFILE_MAX_FILES
+        )
+        response.headers["X-Profile-Id"] = filename
+        return response
+
+if settings.METRICS_ENABLED:
+    # Pool and write-behind gauges, read from their stats() at scrape time
+    REGISTRY.register(StatsCollector("abide_db_pool", "pool", {
+        "primary": lambda: pool_stats(async_engine.sync_engine),
+        "replica": lambda: pool_stats(async_read_engine.sync_engine) if async_read_engine is not None else None,
+    }))
+    REGISTRY.register(StatsCollector("abide_entry_writer", "writer", {
+        "entries": lambda: get_entry_writer().stats() if get_entry_writer() is not None else None,
+    }))
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
@@ -80,7 +168,23 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "abide-backend"}
+    health = {"status": "healthy", "service": "abide-backend"}
+    
+    health["db_pool"] = pool_stats(async_engine.sync_engine)
+    if async_read_engine is not None:
+        health["db_read_pool"] = pool_stats(async_read_engine.sync_engine)
+    
+    entry_writer = get_entry_writer()
+    if entry_writer is not None:
+        health["entry_writer"] = entry_writer.stats()
+    
+    return health
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=generate_latest(REGISTRY), headers={"Content-Type": CONTENT_TYPE_LATEST})
 
 if __name__ == "__main__":
     import uvicorn
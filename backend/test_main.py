@@ -6,6 +6,7 @@ Simple test script to verify backend components work correctly
 import asyncio
 import sys
 import os
+import time
 
 # Add the app directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
@@ -91,6 +92,391 @@ async def test_response_generator():
         print(f"✗ Response generator test failed: {e}")
         return False
 
+async def test_reflection_service():
+    """Test reflection generation against the local stand-in model server"""
+    print("\nTesting Reflection Service...")
+    
+    try:
+        import httpx
+        from services.ai.cache import ReflectionCache
+        from services.ai.local_server import app as local_model_app
+        from services.ai.openai_compatible import OpenAICompatibleBackend
+        from services.ai.reflection import ReflectionService
+        
+        backend = OpenAICompatibleBackend(api_base="http://local-model/v1", model="local-stand-in")
+        backend.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=local_model_app))
+        service = ReflectionService(backend, ReflectionCache(max_size=2), timeout=5.0, max_length=60)
+        
+        reflection = await service.generate("anxiety", "I feel so anxious today", "template")
+        print(f"✓ Generated reflection: {len(reflection)} characters (limit 60)")
+        assert 0 < len(reflection) <= 60
+        
+        cached = await service.generate("anxiety", "Anxious, really anxious", "template")
+        print(f"✓ Similar feeling served from cache: {cached == reflection}")
+        assert cached == reflection and len(service.cache) == 1
+        
+        service.timeout = 0.01
+        fallback = await service.generate("peace", "I need calm", "template")
+        print(f"✓ Timed out generation fell back to template: {fallback == 'template'}")
+        assert fallback == "template"
+        
+        await service.aclose()
+        return True
+        
+    except Exception as e:
+        print(f"✗ Reflection service test failed: {e}")
+        return False
+
+async def test_response_fragments():
+    """Test that pre-encoded responses match the FeelingResponse schema"""
+    print("\nTesting Response Fragments...")
+    
+    try:
+        import json
+        from schemas.feeling import FeelingResponse
+        from services.ai import ResponseGenerator
+        from services.ai.fragments import get_response_fragments
+        
+        generator = ResponseGenerator()
+        response = await generator.generate_feeling_response("I feel lonely tonight")
+        body = get_response_fragments().feeling_response(**response)
+        expected = FeelingResponse(**response).dict()
+        
+        print(f"✓ Assembled {len(body)} byte response for topic: {response['topic']}")
+        assert json.loads(body) == expected
+        print("✓ Body matches FeelingResponse schema")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Response fragments test failed: {e}")
+        return False
+
+async def test_deterministic_selection():
+    """Test that seeded selection is repeatable within a day"""
+    print("\nTesting Deterministic Selection...")
+    
+    try:
+        from core.http_cache import response_seed, make_etag
+        from services.ai import ResponseGenerator
+        
+        generator = ResponseGenerator()
+        seed = response_seed("anxious", user_id=None, day="2024-01-01")
+        first = await generator.generate_devotion(feeling_text="anxious", seed=seed)
+        second = await generator.generate_devotion(feeling_text="anxious", seed=seed)
+        print(f"✓ Same seed gives same scriptures: {first['plan']['scriptures'] == second['plan']['scriptures']}")
+        assert first == second
+        
+        other_day = response_seed("anxious", user_id=None, day="2024-01-02")
+        print(f"✓ Seed changes with the day: {seed != other_day}")
+        assert seed != other_day and make_etag("1", seed) != make_etag("1", other_day)
+        
+        from starlette.requests import Request
+        from core.http_cache import post_precondition_status
+        
+        def conditional(value):
+            headers = [(b"if-none-match", value.encode())] if value else []
+            return Request({"type": "http", "headers": headers})
+        
+        etag = make_etag("1", seed, weak=True)
+        statuses = [post_precondition_status(conditional(value), etag) for value in (etag, '"other"', "*", None)]
+        print(f"✓ Conditional POST statuses (match, mismatch, *, none): {statuses}")
+        assert statuses == [304, None, 412, None]
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Deterministic selection test failed: {e}")
+        return False
+
+async def test_batch_classification():
+    """Test that batch classification and crisis screening match the single-text paths"""
+    print("\nTesting Batch Classification...")
+    
+    try:
+        from core.crisis_detection import CrisisDetector
+        from services.ai import ResponseGenerator
+        
+        texts = [
+            "I feel anxious about my upcoming exam",
+            "I'm so thankful and at ease",
+            "stressed and overwhelmed",
+            "I want to kill myself",
+            "",
+            "nothing in particular",
+        ]
+        
+        generator = ResponseGenerator()
+        topics = generator._classify_feelings(texts)
+        print(f"✓ Classified batch: {topics}")
+        assert topics == [generator._classify_feeling(text) for text in texts]
+        
+        detector = CrisisDetector()
+        flagged = detector.detect_crisis_batch(texts)
+        print(f"✓ Crisis screen flagged {sum(flagged)} of {len(texts)}")
+        assert flagged == [detector.detect_crisis(text) for text in texts]
+        
+        responses = await generator.generate_feeling_responses(texts)
+        print(f"✓ Generated {len(responses)} responses in input order")
+        assert [response["topic"] for response in responses] == topics
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Batch classification test failed: {e}")
+        return False
+
+async def test_content_store():
+    """Test that compact entry storage rebuilds the original responses"""
+    print("\nTesting Content Store...")
+    
+    try:
+        import json
+        from services.ai import ResponseGenerator
+        from services.content import get_content_store
+        from app.models.entry import EntryType
+        
+        store = get_content_store()
+        generator = ResponseGenerator()
+        
+        response = await generator.generate_feeling_response("I feel anxious and worried")
+        compact = store.compact(EntryType.FEEL, response)
+        print(f"✓ Feeling entry: {len(json.dumps(response))} -> {len(json.dumps(compact))} bytes")
+        assert store.expand(EntryType.FEEL, compact) == response
+        
+        devotion = await generator.generate_devotion(theme="hope")
+        compact = store.compact(EntryType.DEVOTION, devotion)
+        print(f"✓ Devotion entry: {len(json.dumps(devotion))} -> {len(json.dumps(compact))} bytes")
+        assert store.expand(EntryType.DEVOTION, compact) == devotion
+        
+        # Legacy rows written before compaction are returned unchanged
+        assert store.expand(EntryType.FEEL, response) == response
+        print("✓ Legacy entries pass through")
+        
+        # A verse removed by a later content release degrades to its bare reference
+        removed = {**compact, "verses": ["Removed 1:1"] + compact["verses"][1:]}
+        expanded = store.expand(EntryType.DEVOTION, removed)
+        assert expanded["plan"]["scriptures"][0] == {"reference": "Removed 1:1", "text": "", "translation": ""}
+        print("✓ Missing verses fall back to their reference")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Content store test failed: {e}")
+        return False
+
+async def test_entry_writer():
+    """Test that the write-behind queue batches entries and drains on close"""
+    print("\nTesting Entry Writer...")
+    
+    try:
+        from services.history.writer import EntryWriter
+        
+        commits = []
+        
+        class RecordingSession:
+            async def __aenter__(self):
+                return self
+            async def __aexit__(self, *exc):
+                return False
+            async def execute(self, statement):
+                pass
+            async def commit(self):
+                commits.append(True)
+        
+        writer = EntryWriter(batch_size=200, flush_interval=60, session_factory=RecordingSession)
+        writer.start()
+        entries = [
+            {"user_id": 1, "type": "feel", "topic": "peace", "input_text": None, "response_json": {}}
+            for _ in range(250)
+        ]
+        await writer.enqueue(entries)
+        await writer.close()
+        
+        stats = writer.stats()
+        print(f"✓ Flushed {stats['flushed']} entries in {stats['flushes']} batches")
+        assert stats["flushed"] == 250 and stats["flushes"] == 2 and len(commits) == 2
+        assert stats["queue_depth"] == 0
+        
+        # A batch that keeps failing is written row by row; the bad row is spilled, not dropped
+        import tempfile
+        from sqlalchemy.exc import IntegrityError
+        import services.history.writer as writer_module
+        
+        saved = []
+        
+        async def save_unless_poisoned(db, batch):
+            if any(entry["topic"] == "poison" for entry in batch):
+                raise IntegrityError("INSERT INTO entries", {}, Exception("bad row"))
+            saved.extend(batch)
+        
+        original_save = writer_module.save_entries
+        writer_module.save_entries = save_unless_poisoned
+        try:
+            spill_dir = tempfile.mkdtemp()
+            writer = EntryWriter(max_retries=0, spill_dir=spill_dir, session_factory=RecordingSession)
+            batch = [dict(entry) for entry in entries[:5]]
+            batch[2]["topic"] = "poison"
+            await writer._flush(batch)
+            stats = writer.stats()
+            print(f"✓ Poisoned batch: {stats['flushed']} saved, {stats['spilled']} spilled, {stats['dropped']} dropped")
+            assert len(saved) == 4 and stats["spilled"] == 1 and stats["dropped"] == 0
+            
+            async def save(db, batch):
+                saved.extend(batch)
+            
+            writer_module.save_entries = save
+            replayed, left = await writer_module.replay_spilled_entries(spill_dir, RecordingSession)
+            print(f"✓ Replayed {replayed} spilled entries, {left} files left")
+            assert replayed == 1 and left == 0 and saved[-1]["topic"] == "poison"
+            
+            # A replayed entry keeps the time it was made, for its history position and its rollup day
+            from datetime import date, datetime, timezone
+            from services.history.trends import topic_day_deltas
+            made_at = datetime(2024, 3, 5, 23, 30, tzinfo=timezone.utc)
+            writer_module.spill_entries(spill_dir, [{**entries[0], "user_id": 7, "created_at": made_at}])
+            await writer_module.replay_spilled_entries(spill_dir, RecordingSession)
+            replayed_entry = saved[-1]
+            print(f"✓ Replayed entry dated {replayed_entry['created_at'].isoformat()}")
+            assert replayed_entry["created_at"] == made_at
+            assert list(topic_day_deltas([replayed_entry])) == [(7, "feel", date(2024, 3, 5), "peace")]
+        finally:
+            writer_module.save_entries = original_save
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Entry writer test failed: {e}")
+        return False
+
+async def test_partition_helpers():
+    """Test monthly partition naming and month arithmetic"""
+    print("\nTesting Partition Helpers...")
+    
+    try:
+        from datetime import date
+        from core.partitions import add_months, partition_name, partition_month
+        
+        assert add_months(date(2024, 1, 1), 1) == date(2024, 2, 1)
+        assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+        assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+        assert add_months(date(2024, 3, 1), -27) == date(2021, 12, 1)
+        print("✓ Month arithmetic crosses year boundaries")
+        
+        assert partition_name(date(2024, 3, 1)) == "entries_y2024m03"
+        assert partition_month("entries_y2024m03") == date(2024, 3, 1)
+        month = date(1999, 12, 1)
+        assert partition_month(partition_name(month)) == month
+        print("✓ Partition names round-trip")
+        
+        for name in ("entries_default", "entries_y2024m3", "entries_legacy", "xentries_y2024m03"):
+            assert partition_month(name) is None
+        print("✓ Other tables are ignored")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Partition helpers test failed: {e}")
+        return False
+
+async def test_lazy_session():
+    """Test that the lazy session is only created when used"""
+    print("\nTesting Lazy Session...")
+    
+    try:
+        from core.database import LazyAsyncSession
+        
+        created = []
+        
+        class RecordingSession:
+            def __init__(self):
+                created.append(self)
+            def add(self, value):
+                pass
+            async def close(self):
+                pass
+        
+        unused = LazyAsyncSession(RecordingSession)
+        await unused.close()
+        print(f"✓ Unused session created: {unused.started}")
+        assert not created
+        
+        used = LazyAsyncSession(RecordingSession)
+        used.add(object())
+        used.add(object())
+        await used.close()
+        print(f"✓ Used session created once: {len(created) == 1}")
+        assert len(created) == 1
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Lazy session test failed: {e}")
+        return False
+
+async def test_stage_timings():
+    """Test per-request stage timings and the Server-Timing header"""
+    print("\nTesting Stage Timings...")
+    
+    try:
+        # Imported under app. like the services, so the metrics are registered once
+        from app.core.metrics import timed, start_request_timings, server_timing_header
+        
+        @timed("lookup")
+        async def lookup():
+            await asyncio.sleep(0.01)
+        
+        timings = start_request_timings()
+        await asyncio.gather(lookup(), lookup())
+        with timed("render"):
+            pass
+        
+        seconds, calls = timings["lookup"]
+        print(f"✓ Concurrent calls recorded: {calls} calls, {seconds * 1000:.1f} ms")
+        assert calls == 2 and seconds >= 0.02
+        
+        header = server_timing_header(timings, 0.05)
+        print(f"✓ Server-Timing: {header}")
+        assert header.startswith('lookup;dur=') and '"2 calls"' in header
+        assert "render;dur=" in header and header.endswith("total;dur=50.00")
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Stage timings test failed: {e}")
+        return False
+
+async def test_stack_sampler():
+    """Test that the sampling profiler attributes time to busy functions"""
+    print("\nTesting Stack Sampler...")
+    
+    try:
+        from core.profiling import StackSampler
+        
+        def busy_loop():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy_loop()
+        sampler.stop()
+        
+        busy = sum(count for stack, count in sampler.samples.items() if stack[-1][0] == "busy_loop")
+        print(f"✓ Samples in busy_loop: {busy} of {sum(sampler.samples.values())}")
+        assert busy > 0
+        
+        profile = sampler.speedscope("busy")["profiles"][0]
+        print(f"✓ Speedscope profile: {len(profile['samples'])} stacks, {profile['endValue']}s")
+        assert "busy_loop (test_main.py:" in sampler.folded()
+        
+        return True
+        
+    except Exception as e:
+        print(f"✗ Stack sampler test failed: {e}")
+        return False
+
 async def main():
     """Run all tests"""
     print("Running Abide Backend Tests...\n")
@@ -99,6 +485,16 @@ async def main():
         test_bible_provider,
         test_crisis_detection,
         test_response_generator,
+        test_reflection_service,
+        test_response_fragments,
+        test_deterministic_selection,
+        test_batch_classification,
+        test_content_store,
+        test_entry_writer,
+        test_partition_helpers,
+        test_lazy_session,
+        test_stage_timings,
+        test_stack_sampler,
     ]
     
     results = []